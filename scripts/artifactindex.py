@@ -0,0 +1,44 @@
+import os
+import threading
+import repodb
+import signing
+
+SOURCES = ["packages", "repo"]
+
+_lock = threading.Lock()
+_index = None
+
+
+def _insert(path, data):
+    packages = _index.setdefault(data["pkgbase"], {})
+    current = packages.get(data["pkgname"], None)
+    if current is None or repodb.vercmp(data["pkgver"], current[1]["pkgver"]) > 0:
+        packages[data["pkgname"]] = (path, data)
+
+
+def _load():
+    global _index
+    if _index is not None:
+        return
+
+    _index = {}
+    paths = []
+    for source in [x for x in SOURCES if os.path.exists(x)]:
+        paths += signing.packages(source)
+
+    for path, data in repodb.metadata(paths).items():
+        _insert(path, data)
+
+
+def lookup(pkgbase):
+    with _lock:
+        _load()
+        packages = _index.get(pkgbase, {})
+        return [x for x, _ in packages.values() if os.path.exists(x)]
+
+
+def add(paths):
+    with _lock:
+        _load()
+        for path, data in repodb.metadata(paths).items():
+            _insert(path, data)
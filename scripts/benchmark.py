@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+parser = argparse.ArgumentParser(
+    prog="benchmark",
+    description="Time how long 'build.py info --json' takes to start",
+)
+parser.add_argument("--packages", type=int, default=5000, help="Packages to generate")
+parser.add_argument("--repos", type=int, default=5, help="Repos to spread them over")
+parser.add_argument("--runs", type=int, default=5, help="Warm runs to time")
+parser.add_argument(
+    "--threshold",
+    type=float,
+    default=100,
+    help="Fail when the median warm run takes longer than this many ms",
+)
+
+
+def _generate(directory, packages, repos):
+    for index in range(packages):
+        repo = os.path.join(directory, f"repo-{index % repos}")
+        os.makedirs(repo, exist_ok=True)
+        with open(os.path.join(repo, f"package-{index}.yml"), "w") as f:
+            f.write(f"git: https://example.com/package-{index}.git\n")
+            if index >= 10 and index % 3 == 0:
+                f.write(f"depends:\n  - package-{index - 10}\n")
+
+
+def _time(args, cwd):
+    # A warm run is one that finds its bytecode cached
+    env = os.environ.copy()
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    start = time.perf_counter()
+    subprocess.check_call(args, cwd=cwd, stdout=subprocess.DEVNULL, env=env)
+    return (time.perf_counter() - start) * 1000
+
+
+def main(argv):
+    args = parser.parse_args(argv)
+    script = os.path.join(os.path.dirname(os.path.realpath(__file__)), "build.py")
+    with tempfile.TemporaryDirectory() as directory:
+        reposdir = os.path.join(directory, "repos")
+        _generate(reposdir, args.packages, args.repos)
+        command = [sys.executable, script, "--repos-dir", reposdir, "info", "--json"]
+        baseline = min(
+            [_time([sys.executable, "-c", "pass"], directory) for _ in range(3)]
+        )
+        cold = _time(command, directory)
+        warm = sorted([_time(command, directory) for _ in range(args.runs)])
+        print(f"Packages: {args.packages}")
+        print(f"Interpreter: {baseline:.0f} ms")
+        print(f"Cold: {cold:.0f} ms")
+        print(f"Warm: {warm[len(warm) // 2]:.0f} ms (median of {args.runs})")
+        print(f"Warm without interpreter: {warm[len(warm) // 2] - baseline:.0f} ms")
+        if warm[len(warm) // 2] > args.threshold:
+            print(f"Warm is over the {args.threshold:.0f} ms threshold")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,11 +1,14 @@
 #!/usr/bin/env python
 import os
 import sys
+import gc
 import argparse
 import util
-import glob
 import json
-import tempfile
+import shutil
+import timings
+import configcache
+import workspace
 
 
 from package import PackageConfig
@@ -25,6 +28,12 @@ parser.add_argument(
     "Each directory will contain yml files of package descriptions",
     default="repos",
 )
+parser.add_argument(
+    "--trace",
+    help="Write a Chrome trace of where time was spent to this file, "
+    "and print a summary of it",
+    default=None,
+)
 subparsers = parser.add_subparsers(dest="action")
 
 
@@ -33,13 +42,188 @@ def noop(*args, **kwds):
 
 
 def action(fn):
-    fn.parser = subparsers.add_parser(fn.__name__)
+    name = fn.__name__.replace("_", "-")
+    fn.parser = subparsers.add_parser(name)
     it = fn(fn.parser)
     next(it)
-    actions[fn.__name__] = it
+    actions[name] = it
     return noop
 
 
+def _changed_argument(parser):
+    parser.add_argument(
+        "--changed",
+        metavar="REVISIONS",
+        help="Only include packages affected by changes in a git revision range",
+        default=None,
+    )
+
+
+def _changed_packages(revisions):
+    import changes
+
+    return PackageConfig.affected_packages(
+        changes.changed_packages(revisions, main.args.reposdir, PackageConfig.files)
+    )
+
+
+def _selected_packages():
+    if main.args.changed is None:
+        return PackageConfig.sorted_packages()
+
+    return _changed_packages(main.args.changed)
+
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m{seconds:02d}s"
+
+
+def _history_reports():
+    import history
+
+    reports = {}
+    if main.args.slowest:
+        reports["slowest"] = [
+            {"package": x, "duration": y} for x, y in history.slowest(main.args.slowest)
+        ]
+
+    if main.args.percentiles:
+        reports["percentiles"] = [
+            {"package": x, "builds": y, "p50": z, "p95": w}
+            for x, y, z, w in history.percentiles()
+        ]
+
+    if main.args.regressions:
+        reports["regressions"] = [
+            {"package": x, "median": y, "latest": z}
+            for x, y, z in history.regressions(main.args.threshold)
+        ]
+
+    if main.args.compute:
+        reports["compute"] = [
+            {"repo": x, "runs": y, "duration": z}
+            for x, y, z in history.compute(main.args.days)
+        ]
+
+    if main.args.json:
+        print(json.dumps(reports))
+        return
+
+    t = util.term()
+    if "slowest" in reports:
+        print("Slowest packages:")
+        for x in reports["slowest"]:
+            print(f"  {x['package']}: {_duration(x['duration'])}")
+
+    if "percentiles" in reports:
+        print("Build durations:")
+        for x in reports["percentiles"]:
+            print(
+                f"  {x['package']}: p50 {_duration(x['p50'])}, "
+                f"p95 {_duration(x['p95'])} ({x['builds']} builds)"
+            )
+
+    if "regressions" in reports:
+        print("Regressions:")
+        for x in reports["regressions"]:
+            print(
+                t.yellow(
+                    f"  {x['package']}: {_duration(x['latest'])}, "
+                    f"usually {_duration(x['median'])}"
+                )
+            )
+
+    if "compute" in reports:
+        print("Compute:")
+        for x in reports["compute"]:
+            print(f"  {x['repo']}: {_duration(x['duration'])} ({x['runs']} runs)")
+
+
+def _matrix_entry(package):
+    return {
+        "repo": package.repo.name,
+        "package": package.name,
+        "runner": package.runner,
+        "image": package.image,
+    }
+
+
+def _shard_arguments(parser):
+    parser.add_argument(
+        "--shard-target-minutes",
+        type=float,
+        default=None,
+        metavar="M",
+        help="Pack packages into shards that take about M minutes to build",
+    )
+    parser.add_argument(
+        "--shard-report",
+        help="Save the shard list here with 'info', or read it from here with "
+        "'build shard'",
+        default=None,
+    )
+
+
+def _info_shards(packages):
+    import shards
+
+    report = shards.pack(packages, main.args.shard_target_minutes)
+    if main.args.shard_report is not None:
+        shards.save(report, main.args.shard_report)
+
+    if main.args.json:
+        print(json.dumps({"include": report}))
+        return
+
+    for shard in report:
+        print(
+            f"Shard {shard['shard']} ({shard['repo']} on {shard['runner']}, "
+            f"~{shard['minutes']} minutes):"
+        )
+        for name in shard["packages"]:
+            print(f"  {name}")
+
+        if shard["needs"]:
+            print(f"  needs: {', '.join([str(x) for x in shard['needs']])}")
+
+
+def _info_layers(packages):
+    selected = set(packages)
+    layers = PackageConfig.layers(packages)
+    if not main.args.json:
+        for index, layer in enumerate(layers):
+            print(f"Layer {index}:")
+            for package in layer:
+                print(f"  {package.repo.name}/{package.name}")
+
+        return
+
+    matrices = []
+    for index, layer in enumerate(layers):
+        matrices.append(
+            {
+                "include": [
+                    dict(
+                        _matrix_entry(x),
+                        layer=index,
+                        needs=[y.name for y in x.full_depends if y in selected],
+                    )
+                    for x in layer
+                ]
+            }
+        )
+
+    print(
+        json.dumps(
+            {
+                "include": [x for y in matrices for x in y["include"]],
+                "layers": matrices,
+            }
+        )
+    )
+
+
 @action
 def info(parser):
     parser.add_argument(
@@ -47,27 +231,30 @@ def info(parser):
         action="store_true",
         help="Output json information for use in a github action matrix",
     )
+    parser.add_argument(
+        "--layers",
+        action="store_true",
+        help="Group packages by dependency depth, longest critical path first",
+    )
+    _shard_arguments(parser)
+    _changed_argument(parser)
     yield
+    packages = _selected_packages()
+    if main.args.shard_target_minutes is not None:
+        _info_shards(packages)
+        return
+
+    if main.args.layers:
+        _info_layers(packages)
+        return
+
     if main.args.json:
-        print(
-            json.dumps(
-                {
-                    "include": [
-                        {
-                            "repo": x.repo.name,
-                            "package": x.name,
-                            "runner": x.runner,
-                            "image": x.image,
-                        }
-                        for x in PackageConfig.sorted_packages()
-                    ]
-                }
-            )
-        )
+        print(json.dumps({"include": [_matrix_entry(x) for x in packages]}))
         return
 
+    selected = set(packages)
     for repo in PackageConfig.repos.values():
-        for package in repo.packages:
+        for package in [x for x in repo.packages if x in selected]:
             print(f"{repo.name}/{package.name}:")
             print(f"  git: {package.git}")
             if package.branch:
@@ -87,7 +274,52 @@ def stats(parser):
         action="store_true",
         help="Output json information for use in a github action matrix",
     )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        metavar="N",
+        help="Show the N packages that take the longest to build",
+    )
+    parser.add_argument(
+        "--percentiles",
+        action="store_true",
+        help="Show the p50 and p95 build duration of each package",
+    )
+    parser.add_argument(
+        "--regressions",
+        action="store_true",
+        help="Show packages whose latest build was much slower than usual",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="How many times slower than its median a build has to be to count "
+        "as a regression",
+    )
+    parser.add_argument(
+        "--compute",
+        action="store_true",
+        help="Show total build and publish time per repo",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=None,
+        help="Only include the last N days in --compute",
+    )
+    _changed_argument(parser)
     yield
+    if (
+        main.args.slowest
+        or main.args.percentiles
+        or main.args.regressions
+        or main.args.compute
+    ):
+        _history_reports()
+        return
+
+    repos = set([x.repo for x in _selected_packages()])
     if main.args.json:
         print(
             json.dumps(
@@ -95,6 +327,7 @@ def stats(parser):
                     "include": [
                         {"repo": x.name, "image": x.image, "packages": len(x.packages)}
                         for x in PackageConfig.repos.values()
+                        if x in repos
                     ]
                 }
             )
@@ -112,6 +345,57 @@ def stats(parser):
         print(f"  {repo.name}: {len(repo.packages)}")
 
 
+@action
+def check_updates(parser):
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output json information about stale packages",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=16,
+        help="Number of remotes to query at the same time",
+    )
+    parser.add_argument(
+        "--output",
+        help="Where to save the report for use with 'build updates'",
+        default=None,
+    )
+    _changed_argument(parser)
+    yield
+    import updates
+
+    stale, unknown = updates.check(_selected_packages(), main.args.jobs)
+    affected = PackageConfig.affected_packages(stale)
+    report = {
+        "stale": [x.name for x in stale],
+        "unknown": [x.name for x in unknown],
+        "packages": [x.name for x in affected],
+    }
+    updates.save(report, main.args.output or updates.REPORT)
+    if main.args.json:
+        print(json.dumps(report))
+        return
+
+    t = util.term()
+    print(f"Stale: {len(stale)}")
+    for package in stale:
+        print(f"  {package.repo.name}/{package.name}")
+
+    fallout = [x for x in affected if x not in stale]
+    print(f"Dependents: {len(fallout)}")
+    for package in fallout:
+        print(f"  {package.repo.name}/{package.name}")
+
+    if unknown:
+        print(t.yellow(f"Unable to query: {len(unknown)}"))
+        for package in unknown:
+            print(t.yellow(f"  {package.repo.name}/{package.name}"))
+
+
 @action
 def images(parser):
     parser.add_argument(
@@ -133,7 +417,144 @@ def images(parser):
         print(f"  {image}")
 
 
+@action
+def store(parser):
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help="Remove objects that are no longer referenced by packages or a repo",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=int(os.environ.get("STORE_KEEP", 2)),
+        help="Number of old versions of each package to keep when collecting",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only show which objects would be removed",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output json information about the store",
+    )
+    yield
+    import objectstore
+
+    _setup_paths()
+    objectstore.intern()
+    removed = []
+    if main.args.gc:
+        removed = objectstore.gc(main.args.keep, main.args.dry_run)
+
+    status = objectstore.status()
+    if main.args.json:
+        status["removed"] = [os.path.basename(x) for x, _ in removed]
+        print(json.dumps(status))
+        return
+
+    t = util.term()
+    verb = "Would remove" if main.args.dry_run else "Removing"
+    for path, _ in removed:
+        print(t.yellow(f"  {verb} {os.path.basename(path)}"))
+
+    if main.args.gc:
+        freed = sum([x for _, x in removed]) / 1024 / 1024
+        print(f"Removed: {len(removed)} ({freed:.1f} MiB)")
+
+    print(f"Objects: {status['objects']}")
+    print(f"  Unreferenced: {status['unreferenced']}")
+    print(f"Size: {status['size'] / 1024 / 1024:.1f} MiB")
+    print(f"Saved: {status['saved'] / 1024 / 1024:.1f} MiB")
+
+
+@action
+def cache(parser):
+    parser.add_argument(
+        "--evict",
+        action="store_true",
+        help="Remove old versions and least recently installed packages",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=int(os.environ.get("PACMAN_CACHE_KEEP", 2)),
+        help="Number of versions of each package to keep when evicting",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=os.environ.get("PACMAN_CACHE_BUDGET", None),
+        help="Size in GiB to trim packages down to when evicting",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="Hard link cached packages to identical store objects and each other",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only show which packages would be removed or linked",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Output json information about the cache",
+    )
+    yield
+    import pacmancache
+
+    _setup_paths()
+    removed = []
+    linked = []
+    if main.args.dedupe:
+        linked = pacmancache.dedupe(main.args.dry_run)
+
+    if main.args.evict:
+        budget = main.args.budget
+        if budget is not None:
+            budget *= 1024**3
+
+        removed = pacmancache.evict(main.args.keep, budget, main.args.dry_run)
+
+    status = pacmancache.status()
+    if main.args.json:
+        status["removed"] = [os.path.basename(x) for x, _ in removed]
+        status["linked"] = [os.path.basename(x) for x, _ in linked]
+        print(json.dumps(status))
+        return
+
+    t = util.term()
+    verb = "Would remove" if main.args.dry_run else "Removing"
+    for path, _ in removed:
+        print(t.yellow(f"  {verb} {os.path.basename(path)}"))
+
+    verb = "Would link" if main.args.dry_run else "Linking"
+    for path, _ in linked:
+        print(t.yellow(f"  {verb} {os.path.basename(path)}"))
+
+    if main.args.evict:
+        freed = sum([x for _, x in removed]) / 1024 / 1024
+        print(f"Removed: {len(removed)} ({freed:.1f} MiB)")
+
+    if main.args.dedupe:
+        saved = sum([x for _, x in linked]) / 1024 / 1024
+        print(f"Linked: {len(linked)} ({saved:.1f} MiB)")
+
+    print(f"Files: {status['files']}")
+    print(f"Size: {status['size'] / 1024 / 1024:.1f} MiB")
+    print(f"  Packages: {status['archives']}")
+    print(f"  Packages size: {status['archives_size'] / 1024 / 1024:.1f} MiB")
+    print(f"  Git mirrors size: {status['git_size'] / 1024 / 1024:.1f} MiB")
+
+
 def _setup_paths():
+    import tempfile
+    import objectstore
+
     if not os.path.exists("cache"):
         os.mkdir("cache")
 
@@ -146,6 +567,12 @@ def _setup_paths():
     if not os.path.exists("www"):
         os.mkdir("www")
 
+    if not os.path.exists("localrepo"):
+        os.mkdir("localrepo")
+
+    if not os.path.exists(objectstore.DIRECTORY):
+        os.mkdir(objectstore.DIRECTORY)
+
     if "WORKDIR" not in os.environ:
         os.environ["WORKDIR"] = os.path.join(tempfile.gettempdir(), "repo.eeems.codes")
 
@@ -170,8 +597,13 @@ def publish(parser):
         raise Exception("Publish failed")
 
 
+def _prefetch(packages, repos=()):
+    PackageConfig.prefetch([x.image for x in packages] + [x.image for x in repos])
+
+
 def _build_all():
-    PackageConfig.build()
+    _prefetch(PackageConfig.sorted_packages(), PackageConfig.repos.values())
+    PackageConfig.build(main.args.jobs)
     PackageConfig.publish()
     if PackageConfig.failed():
         raise Exception("One or more build failed")
@@ -182,11 +614,78 @@ def _build_repo(name):
         raise Exception(f"Repo {name} not found")
 
     repo = PackageConfig.repos[name]
-    repo.build()
+    _prefetch(repo.sorted_packages)
+    repo.build(main.args.jobs)
     if repo.failed:
         raise Exception("One or more build failed")
 
 
+def _build_changed(revisions):
+    if revisions is None:
+        raise Exception("A git revision range is required")
+
+    packages = _changed_packages(revisions)
+    if not packages:
+        print(util.term().green("No packages affected"))
+        return
+
+    _prefetch(packages)
+    PackageConfig.build(main.args.jobs, packages)
+    if [x for x in packages if not x.built]:
+        raise Exception("One or more build failed")
+
+
+def _build_updates(path):
+    import updates
+
+    packages = [
+        PackageConfig.packages[x]
+        for x in updates.load(path or updates.REPORT)["packages"]
+        if x in PackageConfig.packages
+    ]
+    if not packages:
+        print(util.term().green("No packages need updating"))
+        return
+
+    _prefetch(packages)
+    PackageConfig.build(main.args.jobs, packages)
+    if [x for x in packages if not x.built]:
+        raise Exception("One or more build failed")
+
+
+def _build_shard(id):
+    import shards
+
+    if id is None:
+        raise Exception("A shard id is required")
+
+    path = main.args.shard_report or shards.REPORT
+    if main.args.shard_target_minutes is not None:
+        report = shards.pack(
+            PackageConfig.sorted_packages(), main.args.shard_target_minutes
+        )
+
+    elif os.path.exists(path):
+        report = shards.load(path)
+
+    else:
+        raise Exception(
+            f"{path} not found, run 'info --shard-target-minutes --shard-report' "
+            "or pass --shard-target-minutes"
+        )
+
+    shard = next((x for x in report if str(x["shard"]) == id), None)
+    if shard is None:
+        raise Exception(f"Shard {id} not found")
+
+    names = set(shard["packages"])
+    packages = [x for x in PackageConfig.sorted_packages() if x.name in names]
+    _prefetch(packages)
+    PackageConfig.build(main.args.jobs, packages)
+    if [x for x in packages if not x.built]:
+        raise Exception("One or more build failed")
+
+
 def _build_package(name):
     if name not in PackageConfig.packages:
         raise Exception(f"Package {name} not found")
@@ -203,15 +702,68 @@ def build(parser):
         "type",
         help="Type of build to run",
         default="all",
-        choices=["all", "repo", "package"],
+        choices=["all", "repo", "package", "changed", "updates", "shard"],
     )
     parser.add_argument(
         "thing",
-        help="Repo or package to build if type is not 'all'",
+        help="Repo or package to build if type is not 'all', "
+        "a git revision range if type is 'changed', "
+        "a check-updates report if type is 'updates', "
+        "or a shard id if type is 'shard'",
         default=None,
         nargs="?",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of packages to build at the same time",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Build packages even if their fingerprint is unchanged",
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Reuse one long lived container per image for each worker",
+    )
+    parser.add_argument(
+        "--snapshots",
+        action="store_true",
+        help="Start builds from cached images with their toolchains installed",
+    )
+    parser.add_argument(
+        "--snapshot-ttl",
+        type=float,
+        default=None,
+        help="Hours before a toolchain snapshot is rebuilt",
+    )
+    parser.add_argument(
+        "--snapshot-budget",
+        type=float,
+        default=None,
+        help="Gigabytes of toolchain snapshots to keep",
+    )
+    _shard_arguments(parser)
     yield
+    if main.args.force:
+        os.environ["FORCE_BUILD"] = "1"
+
+    if main.args.snapshots:
+        os.environ["SNAPSHOTS"] = "1"
+
+    if main.args.snapshot_ttl is not None:
+        os.environ["SNAPSHOT_TTL"] = str(main.args.snapshot_ttl)
+
+    if main.args.snapshot_budget is not None:
+        os.environ["SNAPSHOT_BUDGET"] = str(main.args.snapshot_budget)
+
+    if main.args.warm:
+        os.environ["WARM_CONTAINERS"] = "1"
+
     _setup_paths()
     if main.args.type == "repo":
         _build_repo(main.args.thing)
@@ -219,6 +771,15 @@ def build(parser):
     elif main.args.type == "package":
         _build_package(main.args.thing)
 
+    elif main.args.type == "changed":
+        _build_changed(main.args.thing)
+
+    elif main.args.type == "updates":
+        _build_updates(main.args.thing)
+
+    elif main.args.type == "shard":
+        _build_shard(main.args.thing)
+
     elif main.args.type == "all":
         _build_all()
 
@@ -227,7 +788,7 @@ def build(parser):
 def pull(parser):
     parser.add_argument("image", help="Image to pull from docker")
     yield
-    PackageConfig.pull(main.args.image)
+    PackageConfig.pull(main.args.image, force=True)
 
 
 @action
@@ -239,10 +800,18 @@ def mirror(parser):
     )
     _ = parser.add_argument(
         "destination",
-        help="SSH destination in the following format: user@server:/path",
+        help="SSH destination in the following format: user@server:/path, "
+        "or a local directory",
     )
     _ = parser.add_argument("--ssh", help="Extra args to pass to ssh", default="")
+    _ = parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Compare every file instead of trusting the destination's manifest",
+    )
     yield
+    import manifest
+
     _setup_paths()
     t = util.term()
     with os.scandir("repo") as d:
@@ -250,6 +819,20 @@ def mirror(parser):
             print(t.red("  There are no packages"))
             return
 
+    shutil.copytree("www", "repo", dirs_exist_ok=True)
+    if "@" not in main.args.destination:
+        print(t.green(f"  Mirroring to {main.args.destination}"))
+        with timings.span("sync"):
+            changed, deleted = manifest.sync_local(
+                "repo", main.args.destination, main.args.full
+            )
+
+        print(f"  Uploaded {len(changed)} files, removed {len(deleted)} files")
+        return
+
+    with timings.span("manifest"):
+        manifest.write(manifest.scan("repo"), os.path.join("repo", manifest.NAME))
+
     image = main.args.image
     PackageConfig.pull(image)
     user = main.args.destination.split("@")[0]
@@ -264,36 +847,41 @@ def mirror(parser):
     env["SERVER"] = server
     env["DIR"] = path
     env["SSH_ARGS"] = main.args.ssh
+    if main.args.full:
+        env["FULL_SYNC"] = "1"
+
     cidirname = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-    success = util.run(
-        [
-            "docker",
-            "run",
-            "--workdir=/pkg",
-            f"--mount=type=bind,src={cidirname},dst=/pkg/ci,readonly",
-            f"--mount=type=bind,src={os.path.realpath('repo')},dst=/pkg/repo",
-            f"--mount=type=bind,src={os.path.realpath('www')},dst=/pkg/www",
-            "-e",
-            "GITHUB_ACTIONS",
-            "-e",
-            "VERBOSE",
-            "-e",
-            "USER",
-            "-e",
-            "SERVER",
-            "-e",
-            "DIR",
-            "-e",
-            "SSH_KEY",
-            "-e",
-            "SSH_ARGS",
-            image,
-            "bash",
-            "ci/scripts/mirror.sh",
-        ],
-        env,
-        chronic="VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ,
-    )
+    with util.task("mirror"), timings.span("container"):
+        success = util.run(
+            [
+                "docker",
+                "run",
+                "--workdir=/pkg",
+                f"--mount=type=bind,src={cidirname},dst=/pkg/ci,readonly",
+                f"--mount=type=bind,src={os.path.realpath('repo')},dst=/pkg/repo",
+                "-e",
+                "GITHUB_ACTIONS",
+                "-e",
+                "VERBOSE",
+                "-e",
+                "USER",
+                "-e",
+                "SERVER",
+                "-e",
+                "DIR",
+                "-e",
+                "SSH_KEY",
+                "-e",
+                "SSH_ARGS",
+                "-e",
+                "FULL_SYNC",
+                image,
+                "bash",
+                "ci/scripts/mirror.sh",
+            ],
+            env,
+            chronic="VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ,
+        )
     if "GITHUB_ACTIONS" in os.environ:
         print("::endgroup::")
 
@@ -310,20 +898,54 @@ def main(argv):
         parser.print_help()
         return
 
-    t = util.term()
-    with util.pushd(main.args.reposdir):
-        for repo in glob.iglob("*/"):
-            for packagePath in glob.iglob(f"{repo}/*.yml"):
-                try:
-                    PackageConfig(os.path.dirname(repo), packagePath)
-
-                except Exception:
-                    print(
-                        t.red(f"Failed handling {packagePath}: {format_exc(0).strip()}")
+    # Loading the config only allocates objects that live until exit, so don't
+    # let the garbage collector walk them while loading or again at shutdown
+    gc.disable()
+    cache = configcache.Cache(code=[sys.modules[PackageConfig.__module__].__file__])
+    files = list(configcache.files(main.args.reposdir))
+    loaded = cache.load([x for _, x in files])
+    if loaded is not None:
+        (
+            PackageConfig.repos,
+            PackageConfig.packages,
+            PackageConfig.files,
+            PackageConfig.order,
+        ) = loaded
+
+    else:
+        for repo, path in files:
+            try:
+                PackageConfig(repo, path, cache.read(path))
+
+            except Exception:
+                print(
+                    util.term().red(
+                        f"Failed handling {os.path.relpath(path, main.args.reposdir)}: "
+                        f"{format_exc(0).strip()}"
                     )
+                )
+
+        PackageConfig.validate()
+        loaded = (
+            PackageConfig.repos,
+            PackageConfig.packages,
+            PackageConfig.files,
+            PackageConfig.order,
+        )
 
-    PackageConfig.validate()
-    [x for x in actions[main.args.action]]
+    cache.save(loaded)
+    gc.freeze()
+    gc.enable()
+    try:
+        with timings.span(main.args.action, "action"):
+            [x for x in actions[main.args.action]]
+
+    finally:
+        workspace.drain()
+        if main.args.trace is not None:
+            timings.export(main.args.trace)
+            print()
+            timings.summary()
 
 
 if __name__ == "__main__":
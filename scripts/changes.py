@@ -0,0 +1,67 @@
+import os
+import subprocess
+import configcache
+
+
+def _old_revision(revisions):
+    if "..." in revisions:
+        left, right = revisions.split("...", 1)
+        return (
+            subprocess.check_output(
+                ["git", "merge-base", left or "HEAD", right or "HEAD"]
+            )
+            .decode()
+            .strip()
+        )
+
+    if ".." in revisions:
+        return revisions.split("..", 1)[0] or "HEAD"
+
+    return revisions
+
+
+def _old_entries(revision, path):
+    try:
+        data = subprocess.check_output(
+            ["git", "show", f"{revision}:./{path}"], stderr=subprocess.DEVNULL
+        )
+
+    except subprocess.CalledProcessError:
+        return {}
+
+    # An empty file or list has no entries, and neither does anything that
+    # isn't a package or a list of them
+    data = configcache.loads(data)
+    if not data or not isinstance(data, (list, dict)):
+        return {}
+
+    if isinstance(data, list):
+        return {x.get("name"): x for x in data if isinstance(x, dict)}
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    data["name"] = name
+    return {name: data}
+
+
+def changed_files(revisions, reposdir):
+    return [
+        x
+        for x in subprocess.check_output(
+            ["git", "diff", "--name-only", "--relative", revisions, "--", reposdir]
+        )
+        .decode()
+        .splitlines()
+        if x.endswith(".yml") and os.path.exists(x)
+    ]
+
+
+def changed_packages(revisions, reposdir, files):
+    revision = _old_revision(revisions)
+    packages = []
+    for path in changed_files(revisions, reposdir):
+        old = _old_entries(revision, path)
+        for package in files.get(os.path.realpath(path), []):
+            if old.get(package.name, None) != package._data:
+                packages.append(package)
+
+    return packages
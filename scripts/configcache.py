@@ -0,0 +1,118 @@
+import os
+import pickle
+
+CACHE = os.path.join("cache", "config.pickle")
+VERSION = 3
+
+
+def loads(text):
+    # yaml is only needed when a file changed, so don't pay for importing it
+    # on every run
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+
+
+def parse(path):
+    with open(path) as f:
+        return loads(f.read())
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _resolve(entry):
+    return os.path.realpath(entry.path) if entry.is_symlink() else entry.path
+
+
+def files(directory):
+    # Same as globbing */*.yml and resolving every path, but only symlinks pay
+    # for realpath
+    with os.scandir(os.path.realpath(directory)) as repos:
+        for repo in repos:
+            if repo.name.startswith(".") or not repo.is_dir():
+                continue
+
+            with os.scandir(_resolve(repo)) as entries:
+                for entry in entries:
+                    if (
+                        not entry.name.startswith(".")
+                        and entry.name.endswith(".yml")
+                        and entry.is_file()
+                    ):
+                        yield repo.name, _resolve(entry)
+
+
+class Cache(object):
+    def __init__(self, path=CACHE, code=()):
+        self.path = os.path.realpath(path)
+        # Loaded objects only match the code that made them
+        self.code = [_stat(x) for x in code]
+        self.entries = {}
+        self.loaded = None
+        self.seen = {}
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+
+            if data["version"] == VERSION:
+                self.entries = data["entries"]
+                if data["code"] == self.code:
+                    self.loaded = data["loaded"]
+
+        except Exception:
+            # Unpickling objects from an older version of the code can fail in
+            # any number of ways, it just means starting over
+            pass
+
+    def read(self, path):
+        # Entries are (size, mtime, data), tuples keep the cache quick to load
+        stat = _stat(path)
+        entry = self.entries.get(path, None)
+        if entry is None or entry[:2] != stat:
+            entry = stat + (parse(path),)
+
+        self.seen[path] = entry
+        return entry[2]
+
+    def load(self, paths):
+        # What the config loaded and validated as last time, as long as every
+        # file is still exactly the same
+        if self.loaded is None or len(paths) != len(self.entries):
+            return None
+
+        for path in paths:
+            entry = self.entries.get(path, None)
+            if entry is None or entry[:2] != _stat(path):
+                return None
+
+        self.seen = self.entries
+        return self.loaded
+
+    def save(self, loaded):
+        if loaded is self.loaded:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(f"{self.path}.tmp", "wb") as f:
+                pickle.dump(
+                    {
+                        "version": VERSION,
+                        "code": self.code,
+                        "entries": self.seen,
+                        "loaded": loaded,
+                    },
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+
+            os.replace(f"{self.path}.tmp", self.path)
+
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            # Not being able to cache the config shouldn't stop a build, and
+            # yaml values that can't be pickled just aren't cached
+            if os.path.exists(f"{self.path}.tmp"):
+                os.unlink(f"{self.path}.tmp")
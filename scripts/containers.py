@@ -0,0 +1,51 @@
+import os
+import re
+import util
+
+
+def env_args(names):
+    args = []
+    for name in names:
+        args += ["-e", name]
+
+    return args
+
+
+class Container(object):
+    def __init__(self, image, worker):
+        self.image = image
+        self.name = "repo-eeems-{}-{}-{}".format(
+            os.getpid(), worker.id, re.sub(r"[^a-zA-Z0-9_.-]", "-", image)
+        )
+
+    def __repr__(self):
+        return f"<Container {self.name}>"
+
+    def start(self, mounts, env):
+        chronic = "VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ
+        if not util.run(
+            ["docker", "run", "--detach", "--rm", "--name", self.name, "--workdir=/pkg"]
+            + mounts
+            + [self.image, "sleep", "infinity"],
+            env,
+            chronic=chronic,
+        ):
+            return False
+
+        return self.exec(
+            ["bash", "ci/scripts/warm.sh"],
+            env,
+            ["GPG_PRIVKEY", "GPGKEY", "GITHUB_ACTIONS", "VERBOSE"],
+        )
+
+    def exec(self, args, env, names=()):
+        return util.run(
+            ["docker", "exec", "--workdir=/pkg"] + env_args(names) + [self.name] + args,
+            env,
+        )
+
+    def reset(self, env):
+        return self.exec(["bash", "ci/scripts/reset.sh"], env, ["VERBOSE"])
+
+    def stop(self):
+        util.run(["docker", "rm", "--force", self.name], chronic=True)
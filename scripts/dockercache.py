@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import time
+import shutil
+import threading
+import contextlib
+import util
+
+from collections import Counter
+
+INDEX = os.path.join("cache", "docker.json")
+SIZE = re.compile(r"^([\d.]+)\s*([kKMGTP]?i?B)$")
+UNITS = {
+    "B": 1,
+    "kB": 1000,
+    "KB": 1000,
+    "MB": 1000**2,
+    "GB": 1000**3,
+    "TB": 1000**4,
+    "KiB": 1024,
+    "MiB": 1024**2,
+    "GiB": 1024**3,
+    "TiB": 1024**4,
+}
+
+_lock = threading.Lock()
+_needed = Counter()
+_pinned = Counter()
+_root = None
+
+
+def high_water():
+    return float(os.environ.get("DOCKER_HIGH_WATER", 85))
+
+
+def low_water():
+    return float(os.environ.get("DOCKER_LOW_WATER", high_water() - 10))
+
+
+def budget():
+    value = os.environ.get("DOCKER_BUDGET", None)
+    return None if value is None else float(value) * 1024**3
+
+
+def parse_size(text):
+    match = SIZE.match(text.strip())
+    if match is None:
+        return 0
+
+    return int(float(match.group(1)) * UNITS.get(match.group(2), 1))
+
+
+def _load():
+    if not os.path.exists(INDEX):
+        return {}
+
+    try:
+        with open(INDEX) as f:
+            return json.load(f)
+
+    except ValueError:
+        return {}
+
+
+def touch(image):
+    if not os.path.exists(os.path.dirname(INDEX)):
+        return
+
+    with _lock:
+        index = _load()
+        index[_name(image)] = time.time()
+        with open(f"{INDEX}.tmp", "w") as f:
+            json.dump(index, f, indent=2)
+
+        os.replace(f"{INDEX}.tmp", INDEX)
+
+
+def _name(image):
+    # docker image ls always shows a tag, config may leave it out
+    if ":" not in image.rsplit("/", 1)[-1]:
+        return f"{image}:latest"
+
+    return image
+
+
+def plan(images):
+    with _lock:
+        _needed.update([_name(x) for x in images])
+
+
+def release(image):
+    with _lock:
+        if _needed[_name(image)] > 0:
+            _needed[_name(image)] -= 1
+
+
+@contextlib.contextmanager
+def pin(image):
+    with _lock:
+        _pinned[_name(image)] += 1
+
+    try:
+        yield
+
+    finally:
+        with _lock:
+            _pinned[_name(image)] -= 1
+
+
+def _protected():
+    with _lock:
+        return set([x for x, y in _needed.items() if y > 0]) | set(
+            [x for x, y in _pinned.items() if y > 0]
+        )
+
+
+def _disk_used():
+    global _root
+    if _root is None:
+        _root = util.output(["docker", "info", "--format", "{{.DockerRootDir}}"]) or "/"
+
+    try:
+        usage = shutil.disk_usage(_root)
+
+    except OSError:
+        usage = shutil.disk_usage("/")
+
+    return usage.used / usage.total * 100
+
+
+def images():
+    output = util.output(
+        [
+            "docker",
+            "image",
+            "ls",
+            "--format",
+            "{{.Repository}}:{{.Tag}}\t{{.ID}}\t{{.Size}}",
+        ]
+    )
+    found = {}
+    for line in (output or "").splitlines():
+        parts = line.split("\t")
+        if len(parts) != 3 or "<none>" in parts[0]:
+            continue
+
+        name, id, size = parts
+        entry = found.setdefault(id, {"names": [], "size": parse_size(size)})
+        entry["names"].append(name)
+
+    return found
+
+
+def _pressure(total, disk):
+    limit = budget()
+    if limit is not None and total > limit:
+        return True
+
+    return disk and _disk_used() > low_water()
+
+
+def maintain():
+    limit = budget()
+    found = images()
+    total = sum([x["size"] for x in found.values()])
+    disk = _disk_used() >= high_water()
+    if not disk and (limit is None or total <= limit):
+        return []
+
+    t = util.term()
+    print(t.yellow("  Docker storage is above its high-water mark, cleaning up"))
+    chronic = "VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ
+    util.run(["docker", "container", "prune", "--force"], chronic=chronic)
+    util.run(["docker", "image", "prune", "--force"], chronic=chronic)
+    util.run(["docker", "builder", "prune", "--force"], chronic=chronic)
+    found = images()
+    total = sum([x["size"] for x in found.values()])
+    protected = _protected()
+    used = _load()
+    candidates = sorted(
+        [x for x in found.values() if not protected.intersection(x["names"])],
+        key=lambda x: max([used.get(y, 0) for y in x["names"]]),
+    )
+    removed = []
+    for entry in candidates:
+        if not _pressure(total, disk):
+            break
+
+        if util.run(["docker", "image", "rm"] + entry["names"], chronic=True):
+            print(f"  Removed {', '.join(entry['names'])}")
+            removed += entry["names"]
+            total -= entry["size"]
+
+    return removed
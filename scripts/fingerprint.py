@@ -0,0 +1,95 @@
+import os
+import json
+import hashlib
+import util
+
+FIELDS = ["git", "branch", "script", "cleanup", "makedepends", "image"]
+
+
+def _path(name, extension="json"):
+    return os.path.join("packages", ".fingerprints", f"{name}.{extension}")
+
+
+def artifacts_list(name):
+    return _path(name, "artifacts")
+
+
+def installed_list(name):
+    return _path(name, "installed")
+
+
+def load(name):
+    path = _path(name)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+
+    except ValueError:
+        return None
+
+
+def image_digest(image):
+    return util.output(["docker", "image", "inspect", "--format={{.Id}}", image])
+
+
+def commit(workdir):
+    return util.output(["git", "-C", workdir, "rev-parse", "HEAD"])
+
+
+def compute(package, commit, digest):
+    depends = {}
+    for depend in package.full_depends:
+        if depend.fingerprint is not None:
+            depends[depend.name] = depend.fingerprint if depend.built else None
+            continue
+
+        record = load(depend.name)
+        depends[depend.name] = None if record is None else record["fingerprint"]
+
+    data = {x: package._data.get(x, None) for x in FIELDS}
+    data["name"] = package.name
+    data["commit"] = commit
+    data["digest"] = digest
+    data["depends"] = depends
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def up_to_date(package):
+    record = load(package.name)
+    if record is None or record["fingerprint"] != package.fingerprint:
+        return False
+
+    return bool(record["artifacts"]) and all(
+        [os.path.exists(os.path.join("packages", x)) for x in record["artifacts"]]
+    )
+
+
+def save(package, commit, digest):
+    path = artifacts_list(package.name)
+    if not os.path.exists(path):
+        return
+
+    with open(path) as f:
+        artifacts = [x.strip() for x in f if x.strip()]
+
+    os.unlink(path)
+    with open(_path(package.name), "w") as f:
+        json.dump(
+            {
+                "fingerprint": package.fingerprint,
+                "commit": commit,
+                "digest": digest,
+                "artifacts": artifacts,
+            },
+            f,
+            indent=2,
+        )
+
+
+def remove(name):
+    for path in (_path(name), artifacts_list(name), installed_list(name)):
+        if os.path.exists(path):
+            os.unlink(path)
@@ -0,0 +1,106 @@
+class CycleError(Exception):
+    def __init__(self, path):
+        self.path = path
+        # Packages print as their whole config, their names are what matter
+        super().__init__(" -> ".join([str(getattr(x, "name", x)) for x in path]))
+
+
+def _walk(roots, edges, cache, visit):
+    # Iterative depth first search so deep dependency chains can't hit the
+    # recursion limit. visit is called for every node in post order.
+    state = {}
+    for root in roots:
+        if root in state or root in cache:
+            continue
+
+        path = [root]
+        stack = [iter(edges(root))]
+        state[root] = False
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                done = path.pop()
+                state[done] = True
+                visit(done)
+                continue
+
+            if node in cache or state.get(node, None) is True:
+                continue
+
+            if node in state:
+                raise CycleError(path[path.index(node) :] + [node])
+
+            state[node] = False
+            path.append(node)
+            stack.append(iter(edges(node)))
+
+
+def sort(nodes, edges):
+    order = []
+    _walk(nodes, edges, {}, order.append)
+    return order
+
+
+def closure(node, edges, cache):
+    def visit(current):
+        result = {}
+        for depend in edges(current):
+            for x in cache[depend]:
+                result[x] = None
+
+            result[depend] = None
+
+        cache[current] = list(result)
+
+    _walk([node], edges, cache, visit)
+    return cache[node]
+
+
+def dependents(roots, nodes, edges):
+    reverse = {}
+    for node in nodes:
+        for depend in edges(node):
+            reverse.setdefault(depend, []).append(node)
+
+    found = set(roots)
+    queue = list(roots)
+    while queue:
+        for node in reverse.get(queue.pop(), []):
+            if node not in found:
+                found.add(node)
+                queue.append(node)
+
+    return found
+
+
+def levels(nodes, edges):
+    depth = {}
+    for node in sort(nodes, edges):
+        depth[node] = max([depth[x] + 1 for x in edges(node)], default=0)
+
+    layers = []
+    for node in nodes:
+        while len(layers) <= depth[node]:
+            layers.append([])
+
+        layers[depth[node]].append(node)
+
+    return layers
+
+
+def critical_path(nodes, edges, weight):
+    # Length of the longest chain of dependents that starts at each node,
+    # including the node itself
+    dependents = {}
+    for node in nodes:
+        for depend in edges(node):
+            dependents.setdefault(depend, []).append(node)
+
+    length = {}
+    for node in reversed(sort(nodes, edges)):
+        length[node] = weight(node) + max(
+            [length[x] for x in dependents.get(node, [])], default=0
+        )
+
+    return length
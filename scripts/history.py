@@ -0,0 +1,222 @@
+import os
+import math
+import time
+import sqlite3
+import threading
+import contextlib
+
+DATABASE = os.path.join("cache", "history.db")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    image TEXT,
+    git_commit TEXT,
+    started REAL NOT NULL,
+    duration REAL NOT NULL,
+    success INTEGER NOT NULL,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    artifact_size INTEGER,
+    peak_disk INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_name ON runs (kind, name, started);
+CREATE TABLE IF NOT EXISTS phases (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+"""
+SAMPLE_INTERVAL = 5
+
+_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _connect():
+    with _lock:
+        connection = sqlite3.connect(DATABASE)
+        try:
+            connection.executescript(SCHEMA)
+            with connection:
+                yield connection
+
+        finally:
+            connection.close()
+
+
+def _size(path):
+    # What the files under path take up on disk, hard links only count once
+    size = 0
+    seen = set()
+    pending = [path]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as d:
+                entries = list(d)
+
+        except OSError:
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                    continue
+
+                stat = entry.stat(follow_symlinks=False)
+
+            except OSError:
+                continue
+
+            if (stat.st_dev, stat.st_ino) not in seen:
+                seen.add((stat.st_dev, stat.st_ino))
+                size += stat.st_blocks * 512
+
+    return size
+
+
+class DiskSampler(object):
+    # Samples how much a build's own workspace grows to, so neither other
+    # workers nor space freed elsewhere at the same time count against it
+    def __init__(self, path):
+        self.path = path
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while True:
+            self.peak = max(self.peak, _size(self.path))
+            if self._stop.wait(SAMPLE_INTERVAL):
+                return
+
+    def __enter__(self):
+        if self.path is not None and os.path.isdir(self.path):
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        if self.path is not None and os.path.isdir(self.path):
+            # Whatever is left at the end may not have been sampled yet
+            self.peak = max(self.peak, _size(self.path))
+
+
+def record(
+    kind,
+    name,
+    repo,
+    started,
+    success,
+    image=None,
+    commit=None,
+    skipped=False,
+    artifact_size=None,
+    peak_disk=None,
+    phases=None,
+):
+    if not os.path.exists(os.path.dirname(DATABASE)):
+        return
+
+    with _connect() as connection:
+        cursor = connection.execute(
+            "INSERT INTO runs (kind, name, repo, image, git_commit, started, "
+            "duration, success, skipped, artifact_size, peak_disk) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                kind,
+                name,
+                repo,
+                image,
+                commit,
+                started,
+                time.time() - started,
+                int(bool(success)),
+                int(bool(skipped)),
+                artifact_size,
+                peak_disk,
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO phases (run, name, duration) VALUES (?, ?, ?)",
+            [(cursor.lastrowid, x, y) for x, y in (phases or {}).items()],
+        )
+
+
+def _durations(kind="build", limit=None):
+    if not os.path.exists(DATABASE):
+        return {}
+
+    with _connect() as connection:
+        rows = connection.execute(
+            "SELECT name, duration FROM runs "
+            "WHERE kind = ? AND success = 1 AND skipped = 0 "
+            "ORDER BY started DESC",
+            (kind,),
+        ).fetchall()
+
+    durations = {}
+    for name, duration in rows:
+        values = durations.setdefault(name, [])
+        if limit is None or len(values) < limit:
+            values.append(duration)
+
+    return durations
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def expected(limit=10):
+    return {x: percentile(y, 50) for x, y in _durations(limit=limit).items()}
+
+
+def slowest(limit=10):
+    durations = _durations(limit=10)
+    averages = [(x, sum(y) / len(y)) for x, y in durations.items()]
+    return sorted(averages, key=lambda x: x[1], reverse=True)[:limit]
+
+
+def percentiles():
+    return [
+        (x, len(y), percentile(y, 50), percentile(y, 95))
+        for x, y in sorted(_durations().items())
+    ]
+
+
+def regressions(threshold=1.5, minimum=60, window=10):
+    # Compare the latest build against the median of the ones before it
+    regressions = []
+    for name, values in _durations(limit=window + 1).items():
+        if len(values) < 3:
+            continue
+
+        latest = values[0]
+        median = percentile(values[1:], 50)
+        if latest > median * threshold and latest - median > minimum:
+            regressions.append((name, median, latest))
+
+    return sorted(regressions, key=lambda x: x[2] - x[1], reverse=True)
+
+
+def compute(days=None):
+    if not os.path.exists(DATABASE):
+        return []
+
+    since = 0 if days is None else time.time() - days * 86400
+    with _connect() as connection:
+        return connection.execute(
+            "SELECT repo, COUNT(*), SUM(duration) FROM runs "
+            "WHERE started >= ? GROUP BY repo ORDER BY SUM(duration) DESC",
+            (since,),
+        ).fetchall()
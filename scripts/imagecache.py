@@ -0,0 +1,51 @@
+import os
+import json
+import time
+import threading
+import util
+
+INDEX = os.path.join("cache", "images.json")
+
+_lock = threading.Lock()
+
+
+def ttl():
+    return float(os.environ.get("IMAGE_TTL", 6)) * 3600
+
+
+def _load():
+    if not os.path.exists(INDEX):
+        return {}
+
+    try:
+        with open(INDEX) as f:
+            return json.load(f)
+
+    except ValueError:
+        return {}
+
+
+def local_id(image):
+    return util.output(["docker", "image", "inspect", "--format={{.Id}}", image])
+
+
+def fresh(image):
+    entry = _load().get(image, None)
+    if entry is None or time.time() - entry["checked"] >= ttl():
+        return False
+
+    return entry["id"] == local_id(image)
+
+
+def record(image):
+    id = local_id(image)
+    if id is None or not os.path.exists(os.path.dirname(INDEX)):
+        return
+
+    with _lock:
+        index = _load()
+        index[image] = {"id": id, "checked": time.time()}
+        with open(f"{INDEX}.tmp", "w") as f:
+            json.dump(index, f, indent=2)
+
+        os.replace(f"{INDEX}.tmp", INDEX)
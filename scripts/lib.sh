@@ -1,6 +1,7 @@
 #!/bin/bash
 log(){ echo -e "\033[0;31m==> $@\033[0m"; }
 sublog(){ echo -e "\033[0;31m  ->  $@\033[0m"; }
+phase(){ echo "::phase::$(date +%s%N) $@"; }
 error(){
   if [[ "x$GITHUB_ACTIONS" != "x" ]];then
     echo -e "::error file=scripts/package.sh::$@"
@@ -0,0 +1,57 @@
+import os
+import threading
+import repodb
+import signing
+import srcinfo
+import objectstore
+
+NAME = "localrepo"
+DIRECTORY = "localrepo"
+SOURCES = ["repo", "packages"]
+
+_lock = threading.Lock()
+_ready = False
+
+
+def _link(paths):
+    for path in objectstore.add(paths):
+        objectstore.link(path, os.path.join(DIRECTORY, os.path.basename(path)))
+
+
+def _update():
+    repodb.update(DIRECTORY, NAME, verbose=False)
+
+
+def path():
+    global _ready
+    with _lock:
+        if not _ready:
+            os.makedirs(DIRECTORY, exist_ok=True)
+            for source in [x for x in SOURCES if os.path.exists(x)]:
+                _link(signing.packages(source))
+
+            _update()
+            _ready = True
+
+    return os.path.realpath(DIRECTORY)
+
+
+def add(paths):
+    path()
+    with _lock:
+        _link(paths)
+        _update()
+
+
+def pkgnames(paths):
+    return sorted(set([x["pkgname"] for x in repodb.metadata(paths).values()]))
+
+
+def provides(paths):
+    # Names the packages satisfy, their own and anything they provide
+    names = set()
+    for data in repodb.metadata(paths).values():
+        names.add(data["pkgname"])
+        names.update([srcinfo.name(x) for x in data["provides"]])
+
+    return names
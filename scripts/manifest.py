@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import shutil
+import signing
+
+from concurrent.futures import ThreadPoolExecutor
+
+NAME = ".manifest"
+CACHE = os.path.join("cache", "mirror.json")
+
+
+def _load_cache():
+    if not os.path.exists(CACHE):
+        return {}
+
+    try:
+        with open(CACHE) as f:
+            return json.load(f)
+
+    except ValueError:
+        return {}
+
+
+def _save_cache(cache):
+    if not os.path.exists(os.path.dirname(CACHE)):
+        return
+
+    with open(f"{CACHE}.tmp", "w") as f:
+        json.dump(cache, f)
+
+    os.replace(f"{CACHE}.tmp", CACHE)
+
+
+def _entry(path, cached):
+    stat = os.stat(path)
+    if (
+        cached is not None
+        and cached["size"] == stat.st_size
+        and cached["mtime"] == stat.st_mtime
+    ):
+        return cached
+
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": signing.sha256(path),
+    }
+
+
+def scan(directory, jobs=None):
+    paths = []
+    links = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name == NAME:
+                continue
+
+            # The repo databases are symlinks to the real archives, they are
+            # mirrored as links
+            if os.path.islink(path):
+                links[os.path.relpath(path, directory)] = {"link": os.readlink(path)}
+
+            else:
+                paths.append(path)
+
+    cache = _load_cache()
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        entries = executor.map(
+            lambda x: _entry(x, cache.get(os.path.realpath(x), None)), paths
+        )
+        entries = dict(zip(paths, entries))
+
+    _save_cache({os.path.realpath(x): y for x, y in entries.items()})
+    manifest = {os.path.relpath(x, directory): y for x, y in entries.items()}
+    manifest.update(links)
+    return manifest
+
+
+def _line(path, entry):
+    if "link" in entry:
+        return f"link\t{entry['link']}\t{path}"
+
+    return f"{entry['sha256']}\t{entry['size']}\t{path}"
+
+
+def dumps(manifest):
+    lines = [_line(x, y) for x, y in manifest.items()]
+    return "".join([f"{x}\n" for x in sorted(lines)])
+
+
+def loads(text):
+    manifest = {}
+    for line in text.splitlines():
+        if line:
+            sha256, size, path = line.split("\t", 2)
+            if sha256 == "link":
+                manifest[path] = {"link": size}
+
+            else:
+                manifest[path] = {"size": int(size), "sha256": sha256}
+
+    return manifest
+
+
+def read(path):
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return loads(f.read())
+
+
+def write(manifest, path):
+    with open(f"{path}.tmp", "w") as f:
+        f.write(dumps(manifest))
+
+    os.replace(f"{path}.tmp", path)
+
+
+def diff(local, remote):
+    changed = [
+        x
+        for x, entry in local.items()
+        if x not in remote or _line(x, remote[x]) != _line(x, entry)
+    ]
+    deleted = [x for x in remote if x not in local]
+    return sorted(changed), sorted(deleted)
+
+
+def _link_tree(source, destination):
+    for root, dirs, files in os.walk(source):
+        target = os.path.join(destination, os.path.relpath(root, source))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                os.symlink(os.readlink(path), os.path.join(target, name))
+
+            elif name != NAME:
+                os.link(path, os.path.join(target, name))
+
+
+def _swap(staging, live):
+    # live is a symlink to a hardlinked copy of staging so that replacing it is
+    # a single rename
+    parent = os.path.dirname(live)
+    release = os.path.join(parent, f".live-{time.time_ns()}")
+    _link_tree(staging, release)
+    previous = os.path.realpath(live) if os.path.islink(live) else None
+    link = os.path.join(parent, ".live.tmp")
+    if os.path.lexists(link):
+        os.unlink(link)
+
+    os.symlink(os.path.basename(release), link)
+    if os.path.isdir(live) and not os.path.islink(live):
+        os.rename(live, f"{release}.old")
+        previous = f"{release}.old"
+
+    os.replace(link, live)
+    if previous is not None and os.path.exists(previous):
+        shutil.rmtree(previous)
+
+
+def sync_local(directory, destination, full=False):
+    staging = os.path.join(destination, "staging")
+    os.makedirs(staging, exist_ok=True)
+    local = scan(directory)
+    remote = {} if full else read(os.path.join(staging, NAME))
+    changed, deleted = diff(local, remote)
+    if full:
+        for root, _, files in os.walk(staging):
+            for name in files:
+                path = os.path.relpath(os.path.join(root, name), staging)
+                if path != NAME and path not in local:
+                    deleted.append(path)
+
+    for path in changed:
+        target = os.path.join(staging, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.lexists(f"{target}.tmp"):
+            os.unlink(f"{target}.tmp")
+
+        if "link" in local[path]:
+            os.symlink(local[path]["link"], f"{target}.tmp")
+
+        else:
+            shutil.copy2(os.path.join(directory, path), f"{target}.tmp")
+
+        os.replace(f"{target}.tmp", target)
+
+    for path in deleted:
+        target = os.path.join(staging, path)
+        if os.path.lexists(target):
+            os.unlink(target)
+
+    write(local, os.path.join(staging, NAME))
+    _swap(staging, os.path.join(destination, "live"))
+    return changed, deleted
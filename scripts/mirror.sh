@@ -11,20 +11,45 @@ set -e
 log(){ echo -e "\033[0;31m==> $@\033[0m"; }
 log "Setting up..."
 sudo mkdir -p tmp
-sudo chown notroot:notroot tmp repo www
+sudo chown notroot:notroot tmp
 touch tmp/server_key
 chmod 600 tmp/server_key
 echo "$SSH_KEY" > tmp/server_key
-cp -r www/* repo/
-log "Uploading to $SERVER..."
 ssh="ssh $SSH_ARGS -oStrictHostKeyChecking=no -i tmp/server_key"
-rsync \
-  -Pcuav \
-  --delete \
-  -e "$ssh" \
-  repo/. \
-  "$USER@$SERVER:$DIR/staging"
+if [[ "x$FULL_SYNC" != "x" ]];then
+  log "Uploading everything to $SERVER..."
+  rsync \
+    -Pcuav \
+    --delete \
+    -e "$ssh" \
+    repo/. \
+    "$USER@$SERVER:$DIR/staging"
+else
+  log "Comparing with $SERVER..."
+  $ssh "$USER@$SERVER" "mkdir -p '$DIR/staging' && cat '$DIR/staging/.manifest' 2> /dev/null || true" \
+    | LC_ALL=C sort > tmp/remote.manifest
+  LC_ALL=C sort repo/.manifest > tmp/local.manifest
+  LC_ALL=C comm -23 tmp/local.manifest tmp/remote.manifest | cut -f3- > tmp/changed.list
+  LC_ALL=C comm -13 \
+    <(cut -f3- tmp/local.manifest | LC_ALL=C sort) \
+    <(cut -f3- tmp/remote.manifest | LC_ALL=C sort) \
+    > tmp/deleted.list
+  log "Uploading $(wc -l < tmp/changed.list) files to $SERVER..."
+  if [ -s tmp/changed.list ];then
+    rsync \
+      -Pav \
+      --files-from=tmp/changed.list \
+      -e "$ssh" \
+      repo/ \
+      "$USER@$SERVER:$DIR/staging"
+  fi
+  log "Removing $(wc -l < tmp/deleted.list) files from $SERVER..."
+  if [ -s tmp/deleted.list ];then
+    $ssh "$USER@$SERVER" "cd '$DIR/staging' && xargs -r -d '\n' rm -f --" < tmp/deleted.list
+  fi
+fi
+rsync -av -e "$ssh" repo/.manifest "$USER@$SERVER:$DIR/staging/.manifest"
 $ssh \
   "$USER@$SERVER" \
-  "rsync -a --delete --link-dest='$DIR/staging' '$DIR/staging/.' '$DIR/live'"
+  "rsync -a --delete --exclude=.manifest --link-dest='$DIR/staging' '$DIR/staging/.' '$DIR/live'"
 rm tmp/server_key
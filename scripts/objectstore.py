@@ -0,0 +1,204 @@
+import os
+import shutil
+import contextlib
+import threading
+import repodb
+import signing
+import util
+
+from functools import cmp_to_key
+
+DIRECTORY = "store"
+OBJECTS = os.path.join(DIRECTORY, "objects")
+VIEWS = ["packages", "repo", "localrepo"]
+
+_lock = threading.Lock()
+
+
+def _objects():
+    if not os.path.exists(OBJECTS):
+        return []
+
+    objects = []
+    with os.scandir(OBJECTS) as d:
+        for entry in d:
+            if not entry.is_dir():
+                continue
+
+            with os.scandir(entry.path) as files:
+                objects += [x.path for x in files if x.is_file()]
+
+    return objects
+
+
+def _inodes(objects):
+    inodes = {}
+    for path in objects:
+        stat = os.stat(path)
+        inodes[(stat.st_dev, stat.st_ino)] = path
+
+    return inodes
+
+
+def _replace(source, destination):
+    tmp = f"{destination}.tmp"
+    try:
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+
+        os.link(source, tmp)
+        os.replace(tmp, destination)
+
+    except OSError:
+        # Files the container left owned by its own user can't always be
+        # linked or replaced, the original copy then just stays where it is
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+
+        return False
+
+    return True
+
+
+def _add(path, inodes):
+    stat = os.stat(path)
+    existing = inodes.get((stat.st_dev, stat.st_ino), None)
+    if existing is not None:
+        return existing
+
+    directory = os.path.join(OBJECTS, signing.sha256(path))
+    os.makedirs(directory, exist_ok=True)
+    with os.scandir(directory) as d:
+        existing = next((x.path for x in d if x.is_file()), None)
+
+    if existing is not None:
+        _replace(existing, path)
+
+    else:
+        existing = os.path.join(directory, os.path.basename(path))
+        try:
+            os.link(path, existing)
+
+        except OSError:
+            shutil.copy2(path, existing)
+            _replace(existing, path)
+
+    stat = os.stat(existing)
+    inodes[(stat.st_dev, stat.st_ino)] = existing
+    return existing
+
+
+def add(paths):
+    with _lock:
+        inodes = _inodes(_objects())
+        objects = []
+        for path in paths:
+            try:
+                objects.append(_add(path, inodes))
+
+            except OSError as ex:
+                print(util.term().yellow(f"  Failed to store {path}: {ex}"))
+                objects.append(path)
+
+        return objects
+
+
+def link(path, destination):
+    if os.path.exists(destination) and os.path.samefile(path, destination):
+        return
+
+    _replace(path, destination)
+
+
+def dedupe(paths, dry_run=False):
+    # Copies of an object keep its name, and its directory is already named
+    # after its hash, so only files with a matching name and size get hashed
+    with _lock:
+        names = {}
+        for path in _objects():
+            names.setdefault(os.path.basename(path), []).append(path)
+
+        linked = []
+        for path in paths:
+            stat = os.stat(path)
+            for existing in names.get(os.path.basename(path), []):
+                other = os.stat(existing)
+                if (other.st_dev, other.st_ino) == (stat.st_dev, stat.st_ino):
+                    break
+
+                if other.st_size != stat.st_size or other.st_dev != stat.st_dev:
+                    continue
+
+                if os.path.basename(os.path.dirname(existing)) != signing.sha256(path):
+                    continue
+
+                if dry_run or _replace(existing, path):
+                    linked.append((path, stat.st_size))
+
+                break
+
+        return linked
+
+
+def intern(directories=None):
+    paths = []
+    for directory in [x for x in directories or VIEWS if os.path.exists(x)]:
+        paths += signing.packages(directory)
+
+    return add(paths)
+
+
+def _remove(path):
+    os.unlink(path)
+    directory = os.path.dirname(path)
+    if not os.listdir(directory):
+        os.rmdir(directory)
+
+
+def gc(keep=0, dry_run=False):
+    with _lock:
+        unreferenced = {}
+        for path in _objects():
+            if os.stat(path).st_nlink > 1:
+                continue
+
+            pkgname, version = repodb.parse_filename(path)
+            unreferenced.setdefault(pkgname, []).append((version, path))
+
+        removed = []
+        for pkgname, versions in unreferenced.items():
+            if pkgname is not None:
+                versions.sort(
+                    key=cmp_to_key(lambda x, y: repodb.vercmp(x[0], y[0])),
+                    reverse=True,
+                )
+                versions = versions[keep:]
+
+            for _, path in versions:
+                removed.append((path, os.path.getsize(path)))
+                if not dry_run:
+                    _remove(path)
+
+        return removed
+
+
+def status():
+    objects = _objects()
+    size = 0
+    saved = 0
+    unreferenced = 0
+    for path in objects:
+        stat = os.stat(path)
+        size += stat.st_size
+        # The first view shares the object's bytes, every other one is a copy
+        # that no longer has to exist
+        saved += stat.st_size * max(stat.st_nlink - 2, 0)
+        if stat.st_nlink == 1:
+            unreferenced += 1
+
+    return {
+        "objects": len(objects),
+        "unreferenced": unreferenced,
+        "size": size,
+        "saved": saved,
+    }
@@ -1,15 +1,35 @@
-import yaml
 import os
 import io
-import glob
 import util
-import shutil
+import graph
+import timings
+import time
+import configcache
+
+from traceback import format_exc
 
 
 class ConfigException(Exception):
     pass
 
 
+def _depends(package):
+    return package.depends
+
+
+def _loop_exception(ex):
+    path = " -> ".join([x.name for x in ex.path])
+    return ConfigException(f"Dependency loop detected: {path}")
+
+
+def _sort(packages):
+    try:
+        return graph.sort(packages, _depends)
+
+    except graph.CycleError as ex:
+        raise _loop_exception(ex)
+
+
 class BaseConfig(object):
     def __getitem__(self, name):
         return self._data[name]
@@ -18,6 +38,8 @@ class BaseConfig(object):
         return name in self._data
 
     def __str__(self):
+        import yaml
+
         return yaml.dump(self._data, default_flow_style=False)
 
 
@@ -26,6 +48,11 @@ class Package(BaseConfig):
         self._data = data
         self._cache = {}
         self.built = False
+        self.skipped = False
+        self.peak_disk = None
+        self.fingerprint = None
+        self.commit = None
+        self.srcinfo = None
         if name is not None:
             self._data["name"] = name
 
@@ -39,6 +66,7 @@ class Package(BaseConfig):
             self.repo = PackageConfig.repos[repo]
 
         PackageConfig.packages[self.name] = self
+        self.repo._packages.append(self)
 
     def __repr__(self):
         return f"<Package {self.name}>"
@@ -52,12 +80,23 @@ class Package(BaseConfig):
 
     @property
     def git(self):
-        return self._data.get("git", f"https://github.com/archlinux/aur.git")
+        import sources
+
+        return self._data.get("git", sources.AUR)
 
     @property
     def branch(self):
         return self._data.get("branch", None)
 
+    @property
+    def checkout_branch(self):
+        import sources
+
+        if self.git == sources.AUR:
+            return self.name
+
+        return self.branch
+
     @property
     def name(self):
         return self._data["name"]
@@ -96,60 +135,181 @@ class Package(BaseConfig):
 
         return self._cache["depends"]
 
-    __entry_package = None
-
     @property
     def full_depends(self):
-        if "full_depends" not in self._cache:
-            if Package.__entry_package is None:
-                Package.__entry_package = self
+        try:
+            return graph.closure(self, _depends, PackageConfig.closures)
+
+        except graph.CycleError as ex:
+            raise _loop_exception(ex)
+
+    @property
+    def artifacts(self):
+        import fingerprint
+
+        record = fingerprint.load(self.name)
+        if record is None:
+            return []
+
+        paths = [os.path.join("packages", x) for x in record["artifacts"]]
+        return [x for x in paths if os.path.exists(x)]
+
+    @property
+    def depends_artifacts(self):
+        import artifactindex
+
+        paths = []
+        for package in self.full_depends:
+            paths += artifactindex.lookup(package.name) or package.artifacts
+
+        return paths
+
+    def build(self, worker=None):
+        import dockercache
+
+        started = time.time()
+        self.peak_disk = None
+        with util.task(self.name), timings.span("build", package=self.name):
+            try:
+                self._build_with(worker)
+
+            finally:
+                dockercache.release(self.image)
+                self._record(started, self.peak_disk)
+
+    def _build_with(self, worker):
+        import scheduler
+        import history
+        import workspace
+
+        if worker is None:
+            worker = scheduler.Worker(0, os.path.realpath(os.environ.get("WORKDIR")))
+            try:
+                self._build_with(worker)
+
+            finally:
+                worker.close()
+
+            return
+
+        with timings.span("workspace", package=self.name):
+            workspace.recycle(worker.workdir)
+
+        # Only this worker's directory, so the peak belongs to this package
+        with history.DiskSampler(worker.workdir) as disk:
+            try:
+                self._build(worker)
+
+            finally:
+                self.peak_disk = disk.peak
+
+    def _record(self, started, peak_disk):
+        import history
+
+        try:
+            history.record(
+                "build",
+                self.name,
+                self.repo.name,
+                started,
+                self.built,
+                image=self.image,
+                commit=self.commit,
+                skipped=self.skipped,
+                artifact_size=sum([os.path.getsize(x) for x in self.artifacts])
+                if self.built
+                else None,
+                peak_disk=peak_disk,
+                phases=timings.totals(int(started * 1e9), package=self.name),
+            )
 
-            elif Package.__entry_package is self:
-                raise ConfigException(f"Dependency loop detected for {self.name}")
+        except Exception:
+            print(
+                util.term().red(f"  Failed to record history: {format_exc(0).strip()}")
+            )
+
+    def _run(self, worker, image, mounts, names, env):
+        import dockercache
+
+        dockercache.touch(image)
+        with timings.span("container", package=self.name), dockercache.pin(image):
+            with util.watch(timings.MARKER) as markers:
+                success = self._exec(worker, image, mounts, names, env)
 
-            packages = []
-            for package in self.depends:
-                for depend in package.full_depends:
-                    packages.append(depend)
+            timings.phases(markers, time.time_ns(), package=self.name)
 
-                if package not in packages:
-                    packages.append(package)
+        return success
 
-            self._cache["full_depends"] = packages
-            Package.__entry_package = None
+    def _exec(self, worker, image, mounts, names, env):
+        import containers
+
+        if "WARM_CONTAINERS" not in os.environ:
+            return util.run(
+                ["docker", "run", "--workdir=/pkg"]
+                + mounts
+                + containers.env_args(names)
+                + [image, "bash", "ci/scripts/package.sh"],
+                env,
+            )
 
-        return self._cache["full_depends"]
+        container = worker.container(image, mounts, env)
+        if container is None:
+            print(util.term().red("  Failed to start container"))
+            return False
+
+        env["WARM_CONTAINER"] = "1"
+        success = container.exec(
+            ["bash", "ci/scripts/package.sh"], env, names + ["WARM_CONTAINER"]
+        )
+        if not container.reset(env):
+            worker.discard(image)
+
+        return success
+
+    def install_plan(self, local, provided=()):
+        import srcinfo
+
+        # Everything the build needs goes into one yay transaction, packages
+        # from the local repo win over anything they have the name of or
+        # provide, since deptest can't see them before they're installed
+        provided = set(local) | set(provided)
+        plan = [f"localrepo/{x}" for x in local]
+        for depend in self.makedepends + srcinfo.dependencies(self.srcinfo):
+            if srcinfo.name(depend) not in provided and depend not in plan:
+                plan.append(depend)
+
+        return plan
+
+    def _build(self, worker):
+        import fingerprint
+        import sources
+        import snapshots
+        import localrepo
+        import artifactindex
+        import pacmancache
+        import srcinfo
 
-    def build(self):
         t = util.term()
         print(t.green(f"=> Building {self.name}"))
-        tmpdirname = os.path.realpath(os.environ.get("WORKDIR"))
-        if os.path.exists(tmpdirname):
-            shutil.rmtree(tmpdirname, onerror=lambda f, p, e: util.sudo_rm(p))
-            os.mkdir(tmpdirname)
-
+        tmpdirname = worker.workdir
         env = os.environ.copy()
         env[
             "GIT_SSH_COMMAND"
         ] = "ssh -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no"
-        args = []
-        if self.branch is not None:
-            args = ["-b", self.branch]
-
-        if self.git == "https://github.com/archlinux/aur.git":
-            args += ["--branch", self.name, "--single-branch"]
-
-        else:
-            args.append("--depth=1")
-
         if "GITHUB_ACTIONS" in os.environ:
             print(f"::group::git checkout {self.git}")
 
-        success = util.run(
-            ["git", "clone"] + args + [self.git, tmpdirname],
-            env,
-            chronic="VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ,
-        )
+        with timings.span("checkout", package=self.name):
+            success = sources.checkout(
+                self.git,
+                self.checkout_branch,
+                tmpdirname,
+                shallow=self.git != sources.AUR,
+                env=env,
+                chronic="VERBOSE" not in os.environ
+                and "GITHUB_ACTIONS" not in os.environ,
+            )
+
         if "GITHUB_ACTIONS" in os.environ:
             print("::endgroup::")
 
@@ -157,94 +317,102 @@ class Package(BaseConfig):
             print(t.red("  Failed to checkout repo"))
             return
 
+        self.srcinfo = srcinfo.read(tmpdirname)
         PackageConfig.pull(self.image)
-        for package in self.full_depends:
-            dependsdir = os.path.join(tmpdirname, "depends")
-
-            for file in glob.iglob(f"packages/{package.name}-*.pkg.tar.*"):
-                if not os.path.exists(dependsdir):
-                    os.mkdir(dependsdir)
-
-                destination = os.path.join(dependsdir, os.path.basename(file))
-                try:
-                    os.link(file, destination)
-                except OSError:
-                    shutil.copyfile(file, destination)
+        commit = self.commit = fingerprint.commit(tmpdirname)
+        digest = fingerprint.image_digest(self.image)
+        self.fingerprint = fingerprint.compute(self, commit, digest)
+        if "FORCE_BUILD" not in os.environ and fingerprint.up_to_date(self):
+            print(t.green("  Up to date, skipping"))
+            self.built = self.skipped = True
+            return
 
+        fingerprint.remove(self.name)
+        os.makedirs(
+            os.path.dirname(fingerprint.artifacts_list(self.name)), exist_ok=True
+        )
         cidirname = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-        args = []
-        with os.scandir("repo") as d:
-            if any(d):
-                args += [
-                    f"--mount=type=bind,src={os.path.realpath('repo')},dst=/pkg/repo"
-                ]
-
-        args += [
-            "-e",
+        mounts = [
+            f"--mount=type=bind,src={cidirname},dst=/pkg/ci,readonly",
+            f"--mount=type=bind,src={tmpdirname},dst=/pkg/pkg",
+            f"--mount=type=bind,src={os.path.realpath('cache')},dst=/pkg/cache",
+            f"--mount=type=bind,src={os.path.realpath('packages')},dst=/pkg/packages",
+        ]
+        names = [
             "GPG_PRIVKEY",
-            "-e",
             "GPGKEY",
-            "-e",
             "GITHUB_ACTIONS",
-            "-e",
             "VERBOSE",
+            "ARTIFACTS_LIST",
+            "INSTALLED_LIST",
+            "HOST_UID",
+            "HOST_GID",
         ]
+        try:
+            with timings.span("deps", package=self.name):
+                mounts.append(
+                    f"--mount=type=bind,src={localrepo.path()},dst=/localrepo,readonly"
+                )
+                depends = localrepo.pkgnames(self.depends_artifacts)
+                provided = localrepo.provides(self.depends_artifacts)
+
+        except Exception:
+            print(t.red(f"  Failed to update local repo: {format_exc(0).strip()}"))
+            return
+
+        plan = self.install_plan(depends, provided)
+        if plan:
+            names.append("INSTALL_PLAN")
+            env["INSTALL_PLAN"] = "\n".join(plan)
+
+        env["ARTIFACTS_LIST"] = fingerprint.artifacts_list(self.name)
+        env["INSTALLED_LIST"] = fingerprint.installed_list(self.name)
+        env["HOST_UID"] = str(os.getuid())
+        env["HOST_GID"] = str(os.getgid())
         if self.script is not None:
-            args += ["-e", "SETUP_SCRIPT"]
+            names.append("SETUP_SCRIPT")
             env["SETUP_SCRIPT"] = self.script
 
         if self.cleanup is not None:
-            args += ["-e", "CLEANUP_SCRIPT"]
+            names.append("CLEANUP_SCRIPT")
             env["CLEANUP_SCRIPT"] = self.cleanup
 
-        if self.makedepends:
-            args += ["-e", "MAKE_DEPENDS"]
-            env["MAKE_DEPENDS"] = ";\n".join(
-                [
-                    "yay -S --needed --cachedir ./cache  --noconfirm " + x
-                    for x in self.makedepends
-                ]
-            )
+        with timings.span("snapshot", package=self.name):
+            image = snapshots.image(self, digest, env)
+
+        if image != self.image and self.script is not None:
+            env["SETUP_SCRIPT"] = snapshots.replay(self.script)
 
         if "GITHUB_ACTIONS" in os.environ:
-            print(f"::group::docker run {self.image}")
-
-        self.built = util.run(
-            [
-                "docker",
-                "run",
-                "--workdir=/pkg",
-                f"--mount=type=bind,src={cidirname},dst=/pkg/ci,readonly",
-                f"--mount=type=bind,src={tmpdirname},dst=/pkg/pkg",
-                f"--mount=type=bind,src={os.path.realpath('cache')},dst=/pkg/cache",
-                f"--mount=type=bind,src={os.path.realpath('packages')},dst=/pkg/packages",
-            ]
-            + args
-            + [
-                self.image,
-                "bash",
-                "ci/scripts/package.sh",
-            ],
-            env,
-        )
+            print(f"::group::docker run {image}")
+
+        self.built = self._run(worker, image, mounts, names, env)
         if "GITHUB_ACTIONS" in os.environ:
             print("::endgroup::")
 
-        if not os.environ.get("DOCKER_PRUNE", False):
-            return
+        pacmancache.record(env["INSTALLED_LIST"])
 
-        if "GITHUB_ACTIONS" in os.environ:
-            print("::group::docker system prune --force")
+        if self.built:
+            fingerprint.save(self, commit, digest)
+            with timings.span("store", package=self.name):
+                try:
+                    localrepo.add(self.artifacts)
+                    artifactindex.add(self.artifacts)
 
-        success = util.run(
-            ["docker", "system", "prune", "--force"],
-            chronic="VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ,
-        )
-        if "GITHUB_ACTIONS" in os.environ:
-            print("::endgroup::")
+                except OSError:
+                    # The package is built, not being able to stage it for
+                    # the packages that depend on it shouldn't fail it
+                    print(
+                        t.yellow(
+                            f"  Failed to update local repo: {format_exc(0).strip()}"
+                        )
+                    )
 
-        if not success:
-            print(t.red("  Failed prune"))
+        if not os.environ.get("DOCKER_PRUNE", False):
+            return
+
+        with timings.span("prune", package=self.name):
+            PackageConfig.maintain_docker()
 
 
 class Repo(object):
@@ -259,42 +427,59 @@ class Repo(object):
         self.name = name
         self.image = "eeems/archlinux:latest"
         self.published = False
+        self._packages = []
 
     @property
     def packages(self):
-        return [
-            x
-            for x in PackageConfig.packages.values()
-            if not x.ignore and x.repo is self
-        ]
+        return [x for x in self._packages if not x.ignore]
 
     @property
     def sorted_packages(self):
-        packages = []
-        for package in self.packages.values():
-            if package.ignore:
-                continue
-
-            for depend in package.full_depends:
-                if depend not in packages:
-                    packages.append(depend)
-
-            if package not in packages:
-                packages.append(package)
-
-        return packages
+        return _sort(self.packages)
 
     @property
     def failed(self):
         return [x for x in self.packages if not x.built]
 
     def publish(self):
+        started = time.time()
+        with util.task(f"publish-{self.name}"), timings.span("publish", repo=self.name):
+            try:
+                self._publish()
+
+            finally:
+                self._record(started)
+
+    def _record(self, started):
+        import history
+
+        try:
+            history.record(
+                "publish",
+                self.name,
+                self.name,
+                started,
+                self.published,
+                image=self.image,
+                phases=timings.totals(int(started * 1e9), repo=self.name),
+            )
+
+        except Exception:
+            print(
+                util.term().red(f"  Failed to record history: {format_exc(0).strip()}")
+            )
+
+    def _publish(self):
+        import signing
+        import repodb
+        import objectstore
+        import workspace
+
         t = util.term()
         print(t.green(f"=> Publishing {self.name}"))
         tmpdirname = os.path.realpath(os.environ.get("WORKDIR"))
-        if os.path.exists(tmpdirname):
-            shutil.rmtree(tmpdirname, onerror=lambda f, p, e: util.sudo_rm(p))
-            os.mkdir(tmpdirname)
+        with timings.span("workspace", repo=self.name):
+            workspace.recycle(tmpdirname)
 
         with os.scandir("repo") as d:
             if not any(d):
@@ -304,66 +489,94 @@ class Repo(object):
         cidirname = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
         env = os.environ.copy()
         env["REPO_NAME"] = self.name
+        env["HOST_UID"] = str(os.getuid())
+        env["HOST_GID"] = str(os.getgid())
+        print(t.green("  Updating database"))
+        try:
+            with timings.span("database", repo=self.name):
+                objectstore.intern(["repo"])
+                repodb.update("repo", self.name)
+
+        except Exception:
+            print(t.red(f"  Failed to update database: {format_exc(0).strip()}"))
+            return
+
+        unsigned = signing.pending("repo")
+        print(f"  {len(unsigned)} packages need signing")
+        with open(os.path.join(tmpdirname, "sign.list"), "w") as f:
+            f.writelines([f"{os.path.basename(x)}\n" for x in unsigned])
+
+        env["SIGN_LIST"] = "/pkg/work/sign.list"
+        with timings.span("container", repo=self.name):
+            self.published = util.run(
+                [
+                    "docker",
+                    "run",
+                    "--workdir=/pkg",
+                    f"--mount=type=bind,src={cidirname},dst=/pkg/ci,readonly",
+                    f"--mount=type=bind,src={os.path.realpath('repo')},dst=/pkg/repo",
+                    f"--mount=type=bind,src={tmpdirname},dst=/pkg/work,readonly",
+                    "-e",
+                    "SIGN_LIST",
+                    "-e",
+                    "HOST_UID",
+                    "-e",
+                    "HOST_GID",
+                    "-e",
+                    "GPG_PRIVKEY",
+                    "-e",
+                    "GPGKEY",
+                    "-e",
+                    "GITHUB_ACTIONS",
+                    "-e",
+                    "REPO_NAME",
+                    "-e",
+                    "VERBOSE",
+                    self.image,
+                    "bash",
+                    "ci/scripts/repo.sh",
+                ],
+                env,
+            )
+
+        if self.published:
+            signing.record("repo", unsigned)
 
-        self.published = util.run(
-            [
-                "docker",
-                "run",
-                "--workdir=/pkg",
-                f"--mount=type=bind,src={cidirname},dst=/pkg/ci,readonly",
-                f"--mount=type=bind,src={os.path.realpath('repo')},dst=/pkg/repo",
-                "-e",
-                "GPG_PRIVKEY",
-                "-e",
-                "GPGKEY",
-                "-e",
-                "GITHUB_ACTIONS",
-                "-e",
-                "REPO_NAME",
-                "-e",
-                "VERBOSE",
-                self.image,
-                "bash",
-                "ci/scripts/repo.sh",
-            ],
-            env,
-        )
         if not os.environ.get("DOCKER_PRUNE", False):
             return
 
-        if not util.run(
-            ["docker", "system", "prune", "--force"],
-            chronic="VERBOSE" not in os.environ,
-        ):
-            print(t.red("  Failed prune"))
+        with timings.span("prune", repo=self.name):
+            PackageConfig.maintain_docker()
 
-    def build(self):
-        for package in self.sorted_packages:
-            if "GITHUB_ACTIONS" in os.environ:
-                print(f"::group::{package.name}")
+    def build(self, jobs=1):
+        import scheduler
 
-            package.build()
-            if "GITHUB_ACTIONS" in os.environ:
-                print("::endgroup::")
+        scheduler.build(self.sorted_packages, jobs)
 
 
 class PackageConfig(BaseConfig):
     repos = {}
     packages = {}
+    closures = {}
+    files = {}
+    order = None
     pulled_images = []
 
-    def __init__(self, repo, path):
-        self.path = os.path.realpath(path)
-        with open(self.path) as f:
-            self._data = yaml.load(f, Loader=yaml.SafeLoader) or {}
+    def __init__(self, repo, path, data=None):
+        self.path = path
+        self._data = configcache.parse(self.path) if data is None else data
 
         if isinstance(self._data, list):
-            for data in self._data:
-                Package(repo, data).validate()
+            packages = [Package(repo, data) for data in self._data]
 
         else:
             name = os.path.splitext(os.path.basename(path))[0]
-            Package(repo, self._data, name).validate()
+            packages = [Package(repo, self._data, name)]
+
+        for package in packages:
+            package.validate()
+
+        PackageConfig.files[self.path] = packages
 
     def __repr__(self):
         return f"<PackageConfig {self.path}>"
@@ -374,29 +587,48 @@ class PackageConfig(BaseConfig):
 
     @staticmethod
     def sorted_packages():
-        packages = []
-        for package in PackageConfig.packages.values():
-            if package.ignore:
-                continue
+        if PackageConfig.order is None:
+            PackageConfig.order = _sort(
+                [x for x in PackageConfig.packages.values() if not x.ignore]
+            )
 
-            for depend in package.full_depends:
-                if depend not in packages:
-                    packages.append(depend)
+        return list(PackageConfig.order)
 
-            if package not in packages:
-                packages.append(package)
+    @staticmethod
+    def affected_packages(packages):
+        found = graph.dependents(packages, PackageConfig.packages.values(), _depends)
+        return [x for x in PackageConfig.sorted_packages() if x in found]
 
-        return packages
+    @staticmethod
+    def layers(packages):
+        import history
+
+        selected = set(packages)
+
+        def edges(package):
+            return [x for x in package.full_depends if x in selected]
+
+        durations = history.expected()
+        default = history.percentile(list(durations.values()), 50) if durations else 1
+        try:
+            layers = graph.levels(packages, edges)
+            lengths = graph.critical_path(
+                packages, edges, lambda x: durations.get(x.name, default)
+            )
+
+        except graph.CycleError as ex:
+            raise _loop_exception(ex)
+
+        return [sorted(x, key=lambda x: lengths[x], reverse=True) for x in layers]
 
     @staticmethod
-    def build():
-        for package in PackageConfig.sorted_packages():
-            if "GITHUB_ACTIONS" in os.environ:
-                print(f"::group::{package.name}")
+    def build(jobs=1, packages=None):
+        import scheduler
 
-            package.build()
-            if "GITHUB_ACTIONS" in os.environ:
-                print("::endgroup::")
+        if packages is None:
+            packages = PackageConfig.sorted_packages()
+
+        scheduler.build(packages, jobs)
 
     @staticmethod
     def publish():
@@ -413,8 +645,53 @@ class PackageConfig(BaseConfig):
         return [x for x in PackageConfig.packages.values() if not x.built]
 
     @staticmethod
-    def pull(image):
-        if image in PackageConfig.pulled_images:
+    def prefetch(images, jobs=4):
+        from concurrent.futures import ThreadPoolExecutor
+
+        images = [
+            x for x in dict.fromkeys(images) if x not in PackageConfig.pulled_images
+        ]
+        if len(images) < 2 or jobs <= 1:
+            for image in images:
+                PackageConfig.pull(image)
+
+            return
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            list(executor.map(PackageConfig._prefetch, images))
+
+    @staticmethod
+    def _prefetch(image):
+        with util.prefix(f"[{image}] "):
+            PackageConfig.pull(image)
+
+    @staticmethod
+    def maintain_docker():
+        import dockercache
+
+        try:
+            removed = dockercache.maintain()
+
+        except Exception:
+            print(
+                util.term().red(f"  Failed to clean up docker: {format_exc(0).strip()}")
+            )
+            return
+
+        PackageConfig.pulled_images = [
+            x for x in PackageConfig.pulled_images if x not in removed
+        ]
+
+    @staticmethod
+    def pull(image, force=False):
+        import imagecache
+        import dockercache
+
+        if image in PackageConfig.pulled_images and not force:
+            return
+
+        if not force and imagecache.fresh(image):
+            PackageConfig.pulled_images.append(image)
             return
 
         t = util.term()
@@ -424,10 +701,13 @@ class PackageConfig(BaseConfig):
         if "GITHUB_ACTIONS" in os.environ:
             print(f"::group::docker pull {image}")
 
-        success = util.run(
-            ["docker", "pull", image],
-            chronic="VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ,
-        )
+        with timings.span("pull", image=image):
+            success = util.run(
+                ["docker", "pull", image],
+                chronic="VERBOSE" not in os.environ
+                and "GITHUB_ACTIONS" not in os.environ,
+            )
+
         if "GITHUB_ACTIONS" in os.environ:
             print("::endgroup::")
 
@@ -435,5 +715,7 @@ class PackageConfig(BaseConfig):
             print(t.red("  Failed to pull image"))
             return
 
+        dockercache.touch(image)
+        imagecache.record(image)
         PackageConfig.pulled_images.append(image)
 
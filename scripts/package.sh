@@ -2,32 +2,54 @@
 set -e
 source $(dirname "${BASH_SOURCE[0]}")/lib.sh
 function cleanup(){
+  phase cleanup
+  if [[ "x$INSTALLED_LIST" != "x" ]];then
+    pacman -Q | while read name version;do
+      compgen -G "cache/$name-$version-*.pkg.tar.*" || true
+    done | grep -v '\.sig$' | sudo tee "$INSTALLED_LIST" > /dev/null || true
+  fi
   log "Cleaning up..."
   sudo rm -rf pkg/*
+  if [[ "x$HOST_UID" != "x" ]];then
+    sudo find cache packages -path cache/git -prune -o -exec chown "$HOST_UID:$HOST_GID" {} +
+  fi
 }
 trap cleanup EXIT
+phase setup
 sudo mkdir -p cache
-sudo chown -R notroot:notroot cache pkg
-setup_chronic_and_keyring
+sudo find cache pkg -path cache/git -prune -o -exec chown notroot:notroot {} +
+if [[ "x$WARM_CONTAINER" == "x" ]];then
+  setup_chronic_and_keyring
+elif ! command -v chronic &> /dev/null;then
+  function chronic(){
+    "$@"
+    return $!
+  }
+fi
 shopt -s dotglob nullglob
-log "Generating local repo..."
-if [ -d /pkg/repo ];then
-  sudo mkdir /repo
-  sudo chown -R notroot:notroot /repo
-  packages=($(echo ./*.pkg.tar{,.gz,.bz2,.xz,.Z,.zst}))
-  repo-add --remove --prevent-downgrade /repo/localrepo.db.tar.gz ${packages[@]}
-  if [ -f /pkg/repo/localrepo.db ];then
+if [ -f /localrepo/localrepo.db ];then
+  log "Adding local repo..."
+  if ! grep -q '^\[localrepo\]' /etc/pacman.conf;then
     echo '[localrepo]' | sudo tee -a /etc/pacman.conf
     echo 'SigLevel = Optional TrustAll' | sudo tee -a /etc/pacman.conf
-    echo 'Server = file:///repo' | sudo tee -a /etc/pacman.conf
+    echo 'Server = file:///localrepo' | sudo tee -a /etc/pacman.conf
   fi
+  sudo cp /localrepo/localrepo.db /var/lib/pacman/sync/localrepo.db
 fi
-log "Updating..."
-_chronic yay -Sy --cachedir ./cache  --noconfirm || true
-command -v rsync &> /dev/null || yay -S --noconfirm --cachedir ./cache rsync
-if compgen -G "depends/*.pkg.tar.*" > /dev/null;then
-  log "Installing defined dependencies..."
-  _chronic yay -U --cachedir ./cache  --noconfirm depends/*.pkg.tar{,.gz,.bz2,.xz,.Z,.zst}
+if [[ "x$WARM_CONTAINER" == "x" ]];then
+  log "Updating..."
+  _chronic yay -Sy --cachedir ./cache  --noconfirm || true
+fi
+phase deps
+log "Installing dependencies..."
+targets=()
+for target in rsync $INSTALL_PLAN;do
+  if [[ "$target" == localrepo/* ]] || ! pacman --deptest "$target" > /dev/null;then
+    targets+=( "$target" )
+  fi
+done
+if [ ${#targets[@]} != 0 ];then
+  _chronic yay -S --needed --cachedir ./cache  --noconfirm "${targets[@]}"
 fi
 if [[ "x$SETUP_SCRIPT" != "x" ]];then
   sudo mkdir tmp
@@ -43,11 +65,7 @@ if ! [ -f pkg/PKGBUILD ];then
   error "PKGBUILD missing"
   exit 1
 fi
-if [[ "x$MAKE_DEPENDS" != "x" ]];then
-  log "Installing Make Depends..."
-  _chronic bash -c "$MAKE_DEPENDS"
-fi
-log "Installing PKGBUILD dependencies..."
+log "Checking PKGBUILD dependencies..."
 depends=()
 makedepends=()
 checkdepends=()
@@ -55,6 +73,7 @@ validpgpkeys=()
 source pkg/PKGBUILD
 deps=( "${depends[@]}" "${makedepends[@]}" "${checkdepends[@]}" )
 deps="${deps[@]}" _chronic bash -c 'pacman --deptest $deps | xargs -r yay -S --cachedir ./cache  --noconfirm'
+phase pgp
 arraylength=${#validpgpkeys[@]}
 if [ $arraylength != 0 ];then
   log "Getting PGP keys..."
@@ -68,11 +87,13 @@ if [ $arraylength != 0 ];then
   done
 fi
 pushd pkg > /dev/null
+phase namcap
 log "Checking PKGBUILD..."
 if ! namcap -i PKGBUILD;then
   error "PKGBUILD invalid"
   debug "$(cat PKGBUILD)"
 fi
+phase makepkg
 log "Building package..."
 export SOURCE_DATE_EPOCH=0
 _chronic makepkg -f --noconfirm
@@ -84,8 +105,13 @@ if [[ "x$CLEANUP_SCRIPT" != "x" ]];then
 fi
 popd > /dev/null
 sudo chown notroot:notroot packages
+phase namcap
 log "Checking packages..."
 ls pkg/*.pkg.tar.* | while read pkgfile;do namcap -i "$pkgfile" || true;done
+phase export
 log "Exporting packages..."
 _chronic rsync -Pcuav pkg/*.pkg.tar.* packages
+if [[ "x$ARTIFACTS_LIST" != "x" ]];then
+  (cd pkg && ls *.pkg.tar.*) | sudo tee "$ARTIFACTS_LIST" > /dev/null
+fi
 log "Done with package"
@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import threading
+import contextlib
+import repodb
+import signing
+import objectstore
+import util
+
+from functools import cmp_to_key
+from collections import Counter
+
+DIRECTORY = "cache"
+INDEX = os.path.join(DIRECTORY, "pacman.json")
+GIT = os.path.join(DIRECTORY, "git")
+
+_lock = threading.Lock()
+
+
+def _load():
+    if not os.path.exists(INDEX):
+        return {}
+
+    try:
+        with open(INDEX) as f:
+            return json.load(f)
+
+    except ValueError:
+        return {}
+
+
+def _save(index):
+    with open(f"{INDEX}.tmp", "w") as f:
+        json.dump(index, f, indent=2)
+
+    os.replace(f"{INDEX}.tmp", INDEX)
+
+
+def record(path):
+    # The build writes the names of the cached archives it ended up installing,
+    # which is what keeps them from being evicted
+    if not os.path.exists(path):
+        return
+
+    try:
+        with open(path) as f:
+            names = [x.strip() for x in f if x.strip()]
+
+    except OSError:
+        return
+
+    with contextlib.suppress(OSError):
+        os.unlink(path)
+
+    if not names or not os.path.exists(DIRECTORY):
+        return
+
+    now = time.time()
+    with _lock:
+        index = _load()
+        for name in names:
+            index[os.path.basename(name)] = now
+
+        try:
+            _save(index)
+
+        except OSError as ex:
+            # Only eviction order depends on this, it's not worth failing a
+            # build over
+            print(util.term().yellow(f"  Failed to save {INDEX}: {ex}"))
+
+
+def _archives():
+    if not os.path.exists(DIRECTORY):
+        return []
+
+    with os.scandir(DIRECTORY) as d:
+        return sorted(
+            [
+                x
+                for x in d
+                if x.is_file(follow_symlinks=False)
+                and x.name.endswith(signing.EXTENSIONS)
+            ],
+            key=lambda x: x.name,
+        )
+
+
+def status():
+    status = {
+        "files": 0,
+        "size": 0,
+        "archives": 0,
+        "archives_size": 0,
+        "git_size": 0,
+    }
+    seen = set()
+    for root, directories, files in os.walk(DIRECTORY):
+        for name in files:
+            path = os.path.join(root, name)
+            stat = os.lstat(path)
+            status["files"] += 1
+            # Deduplicated archives are hard links, their bytes only count once
+            if (stat.st_dev, stat.st_ino) in seen:
+                continue
+
+            seen.add((stat.st_dev, stat.st_ino))
+            status["size"] += stat.st_size
+            if root == DIRECTORY and name.endswith(signing.EXTENSIONS):
+                status["archives"] += 1
+                status["archives_size"] += stat.st_size
+
+            elif path.startswith(GIT + os.sep):
+                status["git_size"] += stat.st_size
+
+    return status
+
+
+def _remove(path):
+    for name in (path, f"{path}.sig"):
+        if os.path.exists(name):
+            os.unlink(name)
+
+
+def evict(keep=2, budget=None, dry_run=False):
+    with _lock:
+        archives = _archives()
+        index = _load()
+        versions = {}
+        for entry in archives:
+            pkgname, version = repodb.parse_filename(entry.name)
+            if pkgname is not None:
+                versions.setdefault(pkgname, []).append((version, entry))
+
+        evicted = set()
+        for entries in versions.values():
+            entries.sort(
+                key=cmp_to_key(lambda x, y: repodb.vercmp(x[0], y[0])), reverse=True
+            )
+            evicted.update([x.path for _, x in entries[keep:]])
+
+        remaining = [x for x in archives if x.path not in evicted]
+        if budget is not None:
+            links = Counter()
+            sizes = {}
+            for entry in remaining:
+                stat = entry.stat(follow_symlinks=False)
+                links[(stat.st_dev, stat.st_ino)] += 1
+                sizes[(stat.st_dev, stat.st_ino)] = stat.st_size
+
+            total = sum(sizes.values())
+            # Archives no build has reported installing fall back to when they
+            # were downloaded
+            remaining.sort(
+                key=lambda x: index.get(x.name, x.stat(follow_symlinks=False).st_mtime)
+            )
+            for entry in remaining:
+                if total <= budget:
+                    break
+
+                evicted.add(entry.path)
+                stat = entry.stat(follow_symlinks=False)
+                links[(stat.st_dev, stat.st_ino)] -= 1
+                if not links[(stat.st_dev, stat.st_ino)]:
+                    total -= stat.st_size
+
+        removed = []
+        for entry in archives:
+            if entry.path not in evicted:
+                continue
+
+            removed.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+            if not dry_run:
+                _remove(entry.path)
+
+        if not dry_run and os.path.exists(DIRECTORY):
+            names = set([x.name for x in archives if x.path not in evicted])
+            _save({x: y for x, y in index.items() if x in names})
+
+        return removed
+
+
+def dedupe(dry_run=False):
+    with _lock:
+        # Archives yay copied in from the local repo are the same bytes as the
+        # store's objects, those are the duplicates that actually happen
+        archives = _archives()
+        linked = objectstore.dedupe([x.path for x in archives], dry_run)
+        sizes = {}
+        for entry in archives:
+            # Not the cached stat, linking to the store changed the inode
+            stat = os.lstat(entry.path)
+            sizes.setdefault(stat.st_size, {}).setdefault(
+                (stat.st_dev, stat.st_ino), []
+            ).append(entry.path)
+
+        for size, inodes in sizes.items():
+            # Only archives that already match in size are worth hashing
+            if len(inodes) < 2:
+                continue
+
+            digests = {}
+            for paths in inodes.values():
+                digests.setdefault(signing.sha256(paths[0]), []).append(paths)
+
+            for groups in digests.values():
+                source = groups[0][0]
+                for path in [x for y in groups[1:] for x in y]:
+                    linked.append((path, size))
+                    if dry_run:
+                        continue
+
+                    tmp = f"{path}.tmp"
+                    if os.path.lexists(tmp):
+                        os.unlink(tmp)
+
+                    os.link(source, tmp)
+                    os.replace(tmp, path)
+
+        return linked
@@ -1,25 +1,35 @@
 #!/bin/bash
 set -e
 source $(dirname "${BASH_SOURCE[0]}")/lib.sh
+function cleanup(){
+  if [[ "x$HOST_UID" != "x" ]];then
+    sudo chown -R "$HOST_UID:$HOST_GID" /pkg/repo
+  fi
+}
+trap cleanup EXIT
 setup_chronic_and_keyring
-log "Creating repo..."
-sublog "Removing old files"
 sudo chown -R notroot:notroot repo
 cd repo
-rm -f "$REPO_NAME.db.tar.gz" "$REPO_NAME.files.tar.gz" "$REPO_NAME.db.tar.gz.old" "$REPO_NAME.db.tar.gz.sig" "$REPO_NAME.files.tar.gz.sig"
 log "Signing packages..."
 shopt -s dotglob nullglob
-packages=($(echo ./*.pkg.tar{,.gz,.bz2,.xz,.Z,.zst}))
-for i in "${!packages[@]}";do
-  file=${packages[i]}
-  echo "    $file.sig"
-  if [ -f "$file".sig ];then
-    rm "$file".sig
-  fi
-  gpg --local-user $GPGKEY --detach-sign --batch --output "$file".sig --sign "$file"
-  if ! [ -f "$file".sig ];then
-    rm "Failed to generate $file.sig"
+if [[ "x$SIGN_LIST" == "x" ]];then
+  SIGN_LIST=/tmp/sign.list
+  packages=($(echo ./*.pkg.tar{,.gz,.bz2,.xz,.Z,.zst}))
+  printf '%s\n' "${packages[@]}" > "$SIGN_LIST"
+fi
+xargs -r -a "$SIGN_LIST" -d '\n' -P "$(nproc)" -I{} bash -c '
+  rm -f "$1.sig"
+  gpg --local-user "$GPGKEY" --detach-sign --batch --output "$1.sig" --sign "$1"
+  if ! [ -f "$1.sig" ];then
+    echo "Failed to generate $1.sig"
     exit 1
   fi
+  echo "    $1.sig"
+' _ {}
+log "Signing database..."
+for suffix in db files;do
+  file="$REPO_NAME.$suffix.tar.gz"
+  rm -f "$file.sig"
+  gpg --local-user "$GPGKEY" --detach-sign --batch --output "$file.sig" --sign "$file"
+  ln -sf "$file.sig" "$REPO_NAME.$suffix.sig"
 done
-repo-add --remove --prevent-downgrade --sign "$REPO_NAME.db.tar.gz" ${packages[@]}
@@ -0,0 +1,507 @@
+import os
+import io
+import json
+import hashlib
+import tarfile
+import threading
+import subprocess
+import signing
+import util
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+
+except ImportError:
+    zstandard = None
+
+CACHE = os.path.join("cache", "repodb.json")
+# File lists are only needed for the files database, they're kept per archive
+# hash next to the cache instead of in it
+FILES = os.path.join("cache", "repodb")
+VERSION = 2
+LISTS = [
+    "group",
+    "license",
+    "replaces",
+    "conflict",
+    "provides",
+    "depend",
+    "optdepend",
+    "makedepend",
+    "checkdepend",
+    "backup",
+]
+DESC = [
+    ("FILENAME", "filename"),
+    ("NAME", "pkgname"),
+    ("BASE", "pkgbase"),
+    ("VERSION", "pkgver"),
+    ("DESC", "pkgdesc"),
+    ("GROUPS", "group"),
+    ("CSIZE", "csize"),
+    ("ISIZE", "size"),
+    ("MD5SUM", "md5sum"),
+    ("SHA256SUM", "sha256sum"),
+    ("URL", "url"),
+    ("LICENSE", "license"),
+    ("ARCH", "arch"),
+    ("BUILDDATE", "builddate"),
+    ("PACKAGER", "packager"),
+    ("REPLACES", "replaces"),
+    ("CONFLICTS", "conflict"),
+    ("PROVIDES", "provides"),
+    ("DEPENDS", "depend"),
+    ("OPTDEPENDS", "optdepend"),
+    ("MAKEDEPENDS", "makedepend"),
+    ("CHECKDEPENDS", "checkdepend"),
+]
+
+_lock = threading.Lock()
+_cache = None
+_cache_stat = None
+_files = {}
+
+
+def _isdigit(c):
+    return "0" <= c <= "9"
+
+
+def _isalpha(c):
+    return "a" <= c <= "z" or "A" <= c <= "Z"
+
+
+def _isalnum(c):
+    return _isdigit(c) or _isalpha(c)
+
+
+def _rpmvercmp(a, b):
+    # Port of rpmvercmp from libalpm so versions sort the same way pacman does
+    if a == b:
+        return 0
+
+    one = two = ptr1 = ptr2 = 0
+    while one < len(a) and two < len(b):
+        while one < len(a) and not _isalnum(a[one]):
+            one += 1
+
+        while two < len(b) and not _isalnum(b[two]):
+            two += 1
+
+        if one >= len(a) or two >= len(b):
+            break
+
+        if one - ptr1 != two - ptr2:
+            return -1 if one - ptr1 < two - ptr2 else 1
+
+        ptr1, ptr2 = one, two
+        test = _isdigit if _isdigit(a[ptr1]) else _isalpha
+        while ptr1 < len(a) and test(a[ptr1]):
+            ptr1 += 1
+
+        while ptr2 < len(b) and test(b[ptr2]):
+            ptr2 += 1
+
+        if ptr2 == two:
+            return 1 if test is _isdigit else -1
+
+        segment1, segment2 = a[one:ptr1], b[two:ptr2]
+        if test is _isdigit:
+            segment1 = segment1.lstrip("0")
+            segment2 = segment2.lstrip("0")
+            if len(segment1) != len(segment2):
+                return -1 if len(segment1) < len(segment2) else 1
+
+        if segment1 != segment2:
+            return -1 if segment1 < segment2 else 1
+
+        one, two = ptr1, ptr2
+
+    if one >= len(a) and two >= len(b):
+        return 0
+
+    if (one >= len(a) and not _isalpha(b[two])) or (one < len(a) and _isalpha(a[one])):
+        return -1
+
+    return 1
+
+
+def _parse_evr(version):
+    epoch = "0"
+    if ":" in version and version.split(":", 1)[0].isdigit():
+        epoch, version = version.split(":", 1)
+
+    release = None
+    if "-" in version:
+        version, release = version.rsplit("-", 1)
+
+    return epoch or "0", version, release
+
+
+def vercmp(a, b):
+    if a == b:
+        return 0
+
+    epoch1, version1, release1 = _parse_evr(a)
+    epoch2, version2, release2 = _parse_evr(b)
+    result = _rpmvercmp(epoch1, epoch2)
+    if result == 0:
+        result = _rpmvercmp(version1, version2)
+
+    if result == 0 and release1 is not None and release2 is not None:
+        result = _rpmvercmp(release1, release2)
+
+    return result
+
+
+def parse_filename(path):
+    name = os.path.basename(path)
+    for extension in signing.EXTENSIONS:
+        if name.endswith(extension):
+            name = name[: -len(extension)]
+            break
+
+    parts = name.rsplit("-", 3)
+    if len(parts) != 4:
+        return None, None
+
+    return parts[0], f"{parts[1]}-{parts[2]}"
+
+
+def _decompressor(path, f):
+    if not path.endswith(".zst"):
+        return f, None
+
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(f), None
+
+    process = subprocess.Popen(["zstd", "-dcq"], stdin=f, stdout=subprocess.PIPE)
+    return process.stdout, process
+
+
+def _read_archive(path):
+    pkginfo = None
+    files = []
+    with open(path, "rb") as f:
+        stream, process = _decompressor(path, f)
+        try:
+            with tarfile.open(fileobj=stream, mode="r|*") as archive:
+                for member in archive:
+                    if member.name.startswith("."):
+                        if member.name == ".PKGINFO":
+                            pkginfo = archive.extractfile(member).read().decode()
+
+                        continue
+
+                    files.append(member.name + ("/" if member.isdir() else ""))
+
+        finally:
+            if process is not None:
+                process.stdout.close()
+                process.wait()
+
+    if process is not None and process.returncode:
+        raise Exception(f"zstd failed to decompress {path}")
+
+    if pkginfo is None:
+        raise Exception(f"{path} is missing .PKGINFO")
+
+    return pkginfo, sorted(set(files))
+
+
+def parse_pkginfo(text):
+    data = {x: [] for x in LISTS}
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#") or " = " not in line:
+            continue
+
+        key, value = line.split(" = ", 1)
+        if key in LISTS:
+            data[key].append(value)
+
+        else:
+            data[key] = value
+
+    return data
+
+
+def _hashes(path):
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+            sha256.update(chunk)
+
+    return md5.hexdigest(), sha256.hexdigest()
+
+
+def _load_cache():
+    # Loaded once and kept, unless something else wrote it in the meantime
+    global _cache, _cache_stat
+    try:
+        stat = os.stat(CACHE)
+
+    except OSError:
+        # Nothing on disk, only keep what this process has when it was never
+        # able to save it either
+        if _cache is None or _cache_stat is not None:
+            return _empty_cache()
+
+        return _cache
+
+    if _cache is not None and _cache_stat == (stat.st_mtime_ns, stat.st_size):
+        return _cache
+
+    try:
+        with open(CACHE) as f:
+            cache = json.load(f)
+
+        if cache.get("version", None) != VERSION:
+            cache = _empty_cache()
+
+    except (OSError, ValueError):
+        cache = _empty_cache()
+
+    _cache, _cache_stat = cache, (stat.st_mtime_ns, stat.st_size)
+    return _cache
+
+
+def _empty_cache():
+    global _cache, _cache_stat
+    _cache, _cache_stat = {"version": VERSION, "paths": {}, "packages": {}}, None
+    return _cache
+
+
+def _save_cache(cache):
+    global _cache_stat
+    if not os.path.exists(os.path.dirname(CACHE)):
+        return
+
+    try:
+        with open(f"{CACHE}.tmp", "w") as f:
+            json.dump(cache, f)
+
+        os.replace(f"{CACHE}.tmp", CACHE)
+        stat = os.stat(CACHE)
+        _cache_stat = (stat.st_mtime_ns, stat.st_size)
+
+    except OSError as ex:
+        print(util.term().yellow(f"  Failed to save {CACHE}: {ex}"))
+
+
+def _files_path(sha256sum):
+    return os.path.join(FILES, f"{sha256sum}.files")
+
+
+def _save_files(sha256sum, files):
+    _files[sha256sum] = files
+    if not os.path.exists(os.path.dirname(CACHE)):
+        return
+
+    path = _files_path(sha256sum)
+    try:
+        os.makedirs(FILES, exist_ok=True)
+        with open(f"{path}.tmp", "w") as f:
+            f.writelines([f"{x}\n" for x in files])
+
+        os.replace(f"{path}.tmp", path)
+
+    except OSError as ex:
+        print(util.term().yellow(f"  Failed to save {path}: {ex}"))
+
+
+def file_list(data):
+    sha256sum = data["sha256sum"]
+    if sha256sum not in _files:
+        with open(_files_path(sha256sum)) as f:
+            _files[sha256sum] = f.read().splitlines()
+
+    return _files[sha256sum]
+
+
+def _has_files(sha256sum):
+    return sha256sum in _files or os.path.exists(_files_path(sha256sum))
+
+
+def _metadata(path, entry, packages):
+    stat = os.stat(path)
+    if (
+        entry is not None
+        and entry["size"] == stat.st_size
+        and entry["mtime"] == stat.st_mtime
+        and entry["sha256sum"] in packages
+        and _has_files(entry["sha256sum"])
+    ):
+        return entry, packages[entry["sha256sum"]]
+
+    md5sum, sha256sum = _hashes(path)
+    entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256sum": sha256sum}
+    if sha256sum in packages and _has_files(sha256sum):
+        return entry, packages[sha256sum]
+
+    pkginfo, files = _read_archive(path)
+    data = parse_pkginfo(pkginfo)
+    data.setdefault("pkgbase", data["pkgname"])
+    data["csize"] = str(stat.st_size)
+    data["md5sum"] = md5sum
+    data["sha256sum"] = sha256sum
+    _save_files(sha256sum, files)
+    return entry, data
+
+
+def metadata(paths, jobs=None, strict=False):
+    with _lock:
+        cache = _load_cache()
+        # Hardlinks of an archive share its size and mtime as well as its
+        # contents, so they can use each other's entries without hashing
+        names = {os.path.basename(x): y for x, y in cache["paths"].items()}
+
+    def load(path):
+        entry = cache["paths"].get(os.path.realpath(path), None)
+        if entry is None:
+            entry = names.get(os.path.basename(path), None)
+
+        try:
+            return _metadata(path, entry, cache["packages"])
+
+        except Exception as ex:
+            if not strict:
+                print(f"  Skipping {os.path.basename(path)}: {ex}")
+
+            failed[path] = ex
+            return None
+
+    failed = {}
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        results = dict(zip(paths, executor.map(load, paths)))
+
+    with _lock:
+        cache = _load_cache()
+        changed = False
+        for path, result in [x for x in results.items() if x[1] is not None]:
+            entry, data = result
+            if cache["paths"].get(os.path.realpath(path), None) != entry:
+                cache["paths"][os.path.realpath(path)] = entry
+                changed = True
+
+            if data["sha256sum"] not in cache["packages"]:
+                cache["packages"][data["sha256sum"]] = data
+                changed = True
+
+        for path in [x for x in cache["paths"] if not os.path.exists(x)]:
+            del cache["paths"][path]
+            changed = True
+
+        used = set([x["sha256sum"] for x in cache["paths"].values()])
+        for sha256sum in [x for x in cache["packages"] if x not in used]:
+            del cache["packages"][sha256sum]
+            _files.pop(sha256sum, None)
+            if os.path.exists(_files_path(sha256sum)):
+                os.unlink(_files_path(sha256sum))
+
+            changed = True
+
+        if changed:
+            _save_cache(cache)
+
+    if strict and failed:
+        raise Exception(
+            "Unable to read "
+            + ", ".join([f"{os.path.basename(x)} ({y})" for x, y in failed.items()])
+        )
+
+    return {
+        x: dict(y[1], filename=os.path.basename(x))
+        for x, y in results.items()
+        if y is not None
+    }
+
+
+def newest(packages):
+    latest = {}
+    for path, data in packages.items():
+        current = latest.get(data["pkgname"], None)
+        if current is None or vercmp(data["pkgver"], current[1]["pkgver"]) > 0:
+            latest[data["pkgname"]] = (path, data)
+
+    return dict(latest.values())
+
+
+def desc(data):
+    lines = []
+    for section, key in DESC:
+        value = data.get(key, None)
+        if not value:
+            continue
+
+        lines += [f"%{section}%"] + (value if isinstance(value, list) else [value])
+        lines.append("")
+
+    return "\n".join(lines) + "\n"
+
+
+def _add(archive, name, text, mtime):
+    data = text.encode("utf-8")
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = mtime
+    info.mode = 0o644
+    archive.addfile(info, io.BytesIO(data))
+
+
+def _write(path, packages, files):
+    with tarfile.open(f"{path}.tmp", "w:gz", format=tarfile.GNU_FORMAT) as archive:
+        for data in sorted(packages, key=lambda x: x["pkgname"]):
+            entry = f"{data['pkgname']}-{data['pkgver']}"
+            mtime = int(data.get("builddate", 0) or 0)
+            info = tarfile.TarInfo(entry)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            info.mtime = mtime
+            archive.addfile(info)
+            _add(archive, f"{entry}/desc", desc(data), mtime)
+            if files:
+                _add(
+                    archive,
+                    f"{entry}/files",
+                    "%FILES%\n" + "".join([f"{x}\n" for x in file_list(data)]),
+                    mtime,
+                )
+
+    os.replace(f"{path}.tmp", path)
+
+
+def _link(target, name):
+    if os.path.lexists(name):
+        os.unlink(name)
+
+    os.symlink(os.path.basename(target), name)
+
+
+def update(directory, name, remove=True, jobs=None, verbose=True):
+    # Leaving an archive out would drop it from the database, so this fails
+    # instead of skipping it
+    packages = metadata(signing.packages(directory), jobs, strict=True)
+    current = newest(packages)
+    if remove:
+        for path in [x for x in packages if x not in current]:
+            if verbose:
+                print(f"  Removing {os.path.basename(path)}")
+
+            for old in (path, f"{path}.sig"):
+                if os.path.exists(old):
+                    os.unlink(old)
+
+    old = os.path.join(directory, f"{name}.db.tar.gz.old")
+    if os.path.exists(old):
+        os.unlink(old)
+
+    for files, suffix in ((False, "db"), (True, "files")):
+        path = os.path.join(directory, f"{name}.{suffix}.tar.gz")
+        _write(path, current.values(), files)
+        _link(path, os.path.join(directory, f"{name}.{suffix}"))
+
+    return current
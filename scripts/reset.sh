@@ -0,0 +1,32 @@
+#!/bin/bash
+set -e
+source $(dirname "${BASH_SOURCE[0]}")/lib.sh
+log "Resetting container..."
+gpgconf --kill all &> /dev/null || true
+packages=($(comm -13 <(cut -d' ' -f1 /warm/packages) <(pacman -Qq | LC_ALL=C sort)))
+if [ ${#packages[@]} -ne 0 ];then
+  _chronic sudo pacman -Rdd --noconfirm "${packages[@]}"
+fi
+sudo cp /warm/pacman.conf /etc/pacman.conf
+# Reinstall the warm versions of anything a build removed or upgraded
+shopt -s nullglob
+archives=()
+while read name version;do
+  for archive in cache/$name-$version-*.pkg.tar.* /var/cache/pacman/pkg/$name-$version-*.pkg.tar.*;do
+    if [[ "$archive" != *.sig ]];then
+      archives+=( "$archive" )
+      break
+    fi
+  done
+done < <(comm -23 /warm/packages <(pacman -Q | LC_ALL=C sort))
+if [ ${#archives[@]} -ne 0 ];then
+  _chronic sudo pacman -Udd --noconfirm "${archives[@]}"
+fi
+if ! cmp -s /warm/packages <(pacman -Q | LC_ALL=C sort);then
+  warning "Unable to restore the installed packages, discarding container"
+  exit 1
+fi
+sudo rm -rf /pkg/tmp /var/lib/pacman/sync/localrepo.db
+sudo find "$HOME" /tmp -mindepth 1 -delete
+sudo tar -C "$HOME" -xpf /warm/home.tar
+sudo tar -C /tmp -xpf /warm/tmp.tar
@@ -0,0 +1,142 @@
+import os
+import util
+import containers
+import dockercache
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from traceback import format_exc
+
+
+class Worker(object):
+    def __init__(self, id, workdir):
+        self.id = id
+        self.workdir = workdir
+        self.containers = {}
+
+    def __repr__(self):
+        return f"<Worker {self.id}>"
+
+    def container(self, image, mounts, env):
+        if image not in self.containers:
+            container = containers.Container(image, self)
+            if not container.start(mounts, env):
+                container.stop()
+                return None
+
+            self.containers[image] = container
+
+        return self.containers[image]
+
+    def discard(self, image):
+        container = self.containers.pop(image, None)
+        if container is not None:
+            container.stop()
+
+    def close(self):
+        for image in list(self.containers):
+            self.discard(image)
+
+
+def _skip(package, depend):
+    print(util.term().yellow(f"=> Skipping {package.name}, {depend.name} failed"))
+
+
+def _build_serial(packages):
+    worker = Worker(0, os.path.realpath(os.environ.get("WORKDIR")))
+    failed = set()
+    try:
+        for package in packages:
+            depend = next((x for x in package.full_depends if x in failed), None)
+            if depend is not None:
+                _skip(package, depend)
+                failed.add(package)
+                continue
+
+            if "GITHUB_ACTIONS" in os.environ:
+                print(f"::group::{package.name}")
+
+            package.build(worker)
+            if not package.built:
+                failed.add(package)
+
+            if "GITHUB_ACTIONS" in os.environ:
+                print("::endgroup::")
+
+    finally:
+        worker.close()
+
+
+def _build_one(package, worker):
+    with util.prefix(f"[{package.name}] "):
+        try:
+            package.build(worker)
+
+        except Exception:
+            print(util.term().red(f"  {format_exc(0).strip()}"))
+            return False
+
+    return package.built
+
+
+def _fail(package, dependents, waiting):
+    # Nothing that depends on a failed package can build, however far down
+    pending = [package]
+    while pending:
+        depend = pending.pop()
+        for dependent in dependents[depend]:
+            if dependent in waiting:
+                del waiting[dependent]
+                _skip(dependent, depend)
+                pending.append(dependent)
+
+
+def build(packages, jobs=1):
+    dockercache.plan([x.image for x in packages])
+    if jobs <= 1:
+        _build_serial(packages)
+        return
+
+    workdir = os.path.realpath(os.environ.get("WORKDIR"))
+    idle = [Worker(x, os.path.join(workdir, f"worker-{x}")) for x in range(jobs)]
+    scheduled = set(packages)
+    waiting = {}
+    dependents = {x: [] for x in packages}
+    for package in packages:
+        waiting[package] = set([x for x in package.full_depends if x in scheduled])
+        for depend in waiting[package]:
+            dependents[depend].append(package)
+
+    ready = deque([x for x in packages if not waiting[x]])
+    running = {}
+    workers = list(idle)
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while ready or running:
+                while ready and idle:
+                    package = ready.popleft()
+                    worker = idle.pop()
+                    future = executor.submit(_build_one, package, worker)
+                    running[future] = (package, worker)
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    package, worker = running.pop(future)
+                    idle.append(worker)
+                    if not future.result():
+                        _fail(package, dependents, waiting)
+                        continue
+
+                    for dependent in dependents[package]:
+                        if dependent not in waiting:
+                            continue
+
+                        waiting[dependent].discard(package)
+                        if not waiting[dependent]:
+                            ready.append(dependent)
+
+    finally:
+        for worker in workers:
+            worker.close()
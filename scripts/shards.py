@@ -0,0 +1,165 @@
+import os
+import json
+import heapq
+import graph
+import history
+
+REPORT = os.path.join("cache", "shards.json")
+DEFAULT_MINUTES = 10
+
+
+def _components(packages):
+    # Packages that depend on each other, directly or not, stay together
+    parent = {x: x for x in packages}
+
+    def find(x):
+        while parent[x] is not x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+
+        return x
+
+    for package in packages:
+        for depend in [x for x in package.full_depends if x in parent]:
+            parent[find(depend)] = find(package)
+
+    components = {}
+    for package in packages:
+        components.setdefault(find(package), []).append(package)
+
+    return list(components.values())
+
+
+def _split(component, minutes, target):
+    # component is in build order, so every chunk only depends on earlier ones
+    chunks = [[]]
+    total = 0
+    for package in component:
+        if chunks[-1] and total + minutes[package] > target:
+            chunks.append([])
+            total = 0
+
+        chunks[-1].append(package)
+        total += minutes[package]
+
+    return chunks
+
+
+def _units(groups, minutes, target):
+    units = []
+    for group in groups:
+        for component in _components(group):
+            units += _split(component, minutes, target)
+
+    # A chunk can depend on a package in another repo that in turn depends on
+    # an earlier package of the same chunk. Splitting the chunks involved down
+    # to single packages always breaks that, as packages can't form a cycle.
+    while True:
+        unit = {x: i for i, y in enumerate(units) for x in y}
+
+        def edges(index):
+            return sorted(
+                set(
+                    [unit[y] for x in units[index] for y in x.full_depends if y in unit]
+                )
+                - set([index])
+            )
+
+        try:
+            graph.sort(range(len(units)), edges)
+            return units, unit, edges
+
+        except graph.CycleError as ex:
+            cycle = set(ex.path)
+            units = [x for i, x in enumerate(units) if i not in cycle] + [
+                [y] for i, x in enumerate(units) if i in cycle for y in x
+            ]
+
+
+def pack(packages, target):
+    durations = history.expected()
+    default = (
+        history.percentile(list(durations.values()), 50) / 60
+        if durations
+        else DEFAULT_MINUTES
+    )
+    minutes = {x: durations.get(x.name, default * 60) / 60 for x in packages}
+    order = {x: i for i, x in enumerate(packages)}
+    groups = {}
+    for package in packages:
+        groups.setdefault((package.runner, package.repo.name), []).append(package)
+
+    units, unit, edges = _units([y for _, y in sorted(groups.items())], minutes, target)
+    size = [sum([minutes[x] for x in y]) for y in units]
+    dependents = {}
+    waiting = {}
+    for index in range(len(units)):
+        waiting[index] = len(edges(index))
+        for depend in edges(index):
+            dependents.setdefault(depend, []).append(index)
+
+    # First fit decreasing, but a unit is only placed once everything it
+    # depends on is, and only into a later shard than those. Shards can then
+    # only need shards before them.
+    ready = [(-size[x], order[units[x][0]], x) for x, y in waiting.items() if not y]
+    heapq.heapify(ready)
+    shards = []
+    location = {}
+    while ready:
+        _, _, index = heapq.heappop(ready)
+        package = units[index][0]
+        earliest = max([location[x] + 1 for x in edges(index)], default=0)
+        for shard in shards[earliest:]:
+            if (
+                shard["runner"] == package.runner
+                and shard["repo"] == package.repo.name
+                and shard["minutes"] + size[index] <= target
+            ):
+                break
+
+        else:
+            shard = {
+                "shard": len(shards),
+                "runner": package.runner,
+                "repo": package.repo.name,
+                "minutes": 0,
+                "packages": [],
+            }
+            shards.append(shard)
+
+        shard["minutes"] += size[index]
+        shard["packages"] += units[index]
+        location[index] = shard["shard"]
+        for dependent in dependents.get(index, []):
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                heapq.heappush(
+                    ready, (-size[dependent], order[units[dependent][0]], dependent)
+                )
+
+    for shard in shards:
+        needs = set()
+        for package in shard["packages"]:
+            needs.update([location[unit[x]] for x in package.full_depends if x in unit])
+
+        needs.discard(shard["shard"])
+        shard["needs"] = sorted(needs)
+        shard["minutes"] = round(shard["minutes"], 1)
+        shard["packages"] = [
+            x.name for x in sorted(shard["packages"], key=lambda x: order[x])
+        ]
+
+    # CI can only run the shards if their needs don't form a cycle
+    graph.sort([x["shard"] for x in shards], lambda x: shards[x]["needs"])
+    return shards
+
+
+def save(report, path=REPORT):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def load(path=REPORT):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,104 @@
+import os
+import json
+import hashlib
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST = os.path.join("cache", "signatures.json")
+EXTENSIONS = (
+    ".pkg.tar",
+    ".pkg.tar.gz",
+    ".pkg.tar.bz2",
+    ".pkg.tar.xz",
+    ".pkg.tar.Z",
+    ".pkg.tar.zst",
+)
+
+_lock = threading.Lock()
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _load():
+    if not os.path.exists(MANIFEST):
+        return {}
+
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+
+    except ValueError:
+        return {}
+
+
+def _save(manifest):
+    with open(f"{MANIFEST}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(f"{MANIFEST}.tmp", MANIFEST)
+
+
+def packages(directory):
+    with os.scandir(directory) as entries:
+        return sorted(
+            [x.path for x in entries if x.is_file() and x.name.endswith(EXTENSIONS)]
+        )
+
+
+def _needs_signature(path, entry):
+    signature = f"{path}.sig"
+    if entry is None or not os.path.exists(signature):
+        return True
+
+    stat = os.stat(path)
+    if os.stat(signature).st_mtime < stat.st_mtime:
+        return True
+
+    if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return False
+
+    return sha256(path) != entry["sha256"]
+
+
+def pending(directory, jobs=None):
+    with _lock:
+        manifest = _load()
+
+    paths = packages(directory)
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        results = executor.map(
+            lambda x: _needs_signature(x, manifest.get(os.path.realpath(x), None)),
+            paths,
+        )
+        return [x for x, needed in zip(paths, results) if needed]
+
+
+def _entry(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256(path)}
+
+
+def record(directory, signed, jobs=None):
+    signed = set([os.path.realpath(x) for x in signed])
+    with _lock:
+        manifest = _load()
+        paths = [os.path.realpath(x) for x in packages(directory)]
+        stale = [x for x in paths if x in signed or x not in manifest]
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            for path, entry in zip(stale, executor.map(_entry, stale)):
+                manifest[path] = entry
+
+        prefix = os.path.join(os.path.realpath(directory), "")
+        for path in [x for x in manifest if x.startswith(prefix)]:
+            if not os.path.exists(path):
+                del manifest[path]
+
+        _save(manifest)
@@ -0,0 +1,23 @@
+#!/bin/bash
+set -e
+source $(dirname "${BASH_SOURCE[0]}")/lib.sh
+function cleanup(){
+  if [[ "x$HOST_UID" != "x" ]];then
+    sudo find cache -path cache/git -prune -o -exec chown "$HOST_UID:$HOST_GID" {} +
+  fi
+}
+trap cleanup EXIT
+sudo mkdir -p cache
+sudo find cache -path cache/git -prune -o -exec chown notroot:notroot {} +
+log "Updating..."
+yay -Sy --cachedir ./cache  --noconfirm
+if [[ "x$MAKE_DEPENDS" != "x" ]];then
+  log "Installing Make Depends..."
+  bash -c "$MAKE_DEPENDS"
+fi
+if [[ "x$INSTALL_SCRIPT" != "x" ]];then
+  log "Installing setup script dependencies..."
+  bash -c "$INSTALL_SCRIPT"
+fi
+log "Cleaning up..."
+sudo rm -rf ~/.cache/yay /tmp/*
@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import util
+
+INDEX = os.path.join("cache", "snapshots.json")
+REPOSITORY = "repo-eeems-snapshot"
+INSTALL_LINE = re.compile(r"\b(yay|pacman)\s+(-\w*S\w*)")
+# -S combined with any of these searches, queries or cleans instead of installing
+QUERY = set("cgils")
+
+_lock = threading.Lock()
+_key_locks = {}
+
+
+def enabled():
+    return "SNAPSHOTS" in os.environ
+
+
+def ttl():
+    return float(os.environ.get("SNAPSHOT_TTL", 7 * 24)) * 3600
+
+
+def budget():
+    return float(os.environ.get("SNAPSHOT_BUDGET", 20)) * 1024**3
+
+
+def install_lines(script):
+    if script is None:
+        return []
+
+    return [
+        x.strip()
+        for x in script.splitlines()
+        if INSTALL_LINE.search(x) and " -U" not in x
+    ]
+
+
+def replay(script):
+    # The snapshot already installed what these lines install, with --needed
+    # running them again only checks that instead of reinstalling everything
+    lines = []
+    for line in script.splitlines():
+        match = INSTALL_LINE.search(line)
+        if (
+            match is not None
+            and " -U" not in line
+            and "--needed" not in line
+            and not QUERY & set(match.group(2))
+        ):
+            line = f"{line[:match.end()]} --needed{line[match.end():]}"
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def make_depends(package):
+    if not package.makedepends:
+        return ""
+
+    return "yay -S --needed --cachedir ./cache  --noconfirm " + " ".join(
+        sorted(package.makedepends)
+    )
+
+
+def key(package, digest):
+    lines = install_lines(package.script)
+    if digest is None or not (package.makedepends or lines):
+        return None
+
+    data = {
+        "digest": digest,
+        "makedepends": sorted(package.makedepends),
+        "install": lines,
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _load():
+    if not os.path.exists(INDEX):
+        return {}
+
+    try:
+        with open(INDEX) as f:
+            return json.load(f)
+
+    except ValueError:
+        return {}
+
+
+def _save(index):
+    try:
+        with open(f"{INDEX}.tmp", "w") as f:
+            json.dump(index, f, indent=2)
+
+        os.replace(f"{INDEX}.tmp", INDEX)
+
+    except OSError as ex:
+        # Losing track of a snapshot only means it gets rebuilt, that's not
+        # worth failing a build over
+        print(util.term().yellow(f"  Failed to save {INDEX}: {ex}"))
+
+
+def _update(key, **kwds):
+    with _lock:
+        index = _load()
+        index[key] = dict(index.get(key, {}), **kwds)
+        _save(index)
+
+
+def _forget(key):
+    with _lock:
+        index = _load()
+        index.pop(key, None)
+        _save(index)
+
+
+def _exists(tag):
+    return (
+        util.output(["docker", "image", "inspect", "--format={{.Id}}", tag]) is not None
+    )
+
+
+def _remove(tag):
+    util.run(["docker", "image", "rm", "--force", tag], chronic=True)
+
+
+def _create(package, tag, env):
+    t = util.term()
+    print(t.green(f"  Creating snapshot {tag}"))
+    cidirname = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    name = tag.replace(":", "-")
+    env = env.copy()
+    env["MAKE_DEPENDS"] = make_depends(package)
+    env["INSTALL_SCRIPT"] = ";\n".join(install_lines(package.script))
+    env["HOST_UID"] = str(os.getuid())
+    env["HOST_GID"] = str(os.getgid())
+    chronic = "VERBOSE" not in os.environ and "GITHUB_ACTIONS" not in os.environ
+    util.run(["docker", "rm", "--force", name], chronic=True)
+    success = util.run(
+        [
+            "docker",
+            "run",
+            "--name",
+            name,
+            "--workdir=/pkg",
+            f"--mount=type=bind,src={cidirname},dst=/pkg/ci,readonly",
+            f"--mount=type=bind,src={os.path.realpath('cache')},dst=/pkg/cache",
+            "-e",
+            "MAKE_DEPENDS",
+            "-e",
+            "INSTALL_SCRIPT",
+            "-e",
+            "HOST_UID",
+            "-e",
+            "HOST_GID",
+            "-e",
+            "VERBOSE",
+            package.image,
+            "bash",
+            "ci/scripts/snapshot.sh",
+        ],
+        env,
+        chronic=chronic,
+    ) and util.run(["docker", "commit", name, tag], chronic=True)
+    util.run(["docker", "rm", "--force", name], chronic=True)
+    if not success:
+        print(t.red("  Failed to create snapshot"))
+
+    return success
+
+
+def evict(keep=()):
+    with _lock:
+        index = _load()
+        total = sum([x.get("size", 0) for x in index.values()])
+        for key, entry in sorted(index.items(), key=lambda x: x[1].get("used", 0)):
+            if total <= budget():
+                break
+
+            if entry["image"] in keep:
+                continue
+
+            _remove(entry["image"])
+            total -= entry.get("size", 0)
+            del index[key]
+
+        _save(index)
+
+
+def image(package, digest, env):
+    if not enabled():
+        return package.image
+
+    snapshot = key(package, digest)
+    if snapshot is None:
+        return package.image
+
+    with _lock:
+        lock = _key_locks.setdefault(snapshot, threading.Lock())
+
+    with lock:
+        tag = f"{REPOSITORY}:{snapshot[:32]}"
+        entry = _load().get(snapshot, None)
+        fresh = entry is not None and time.time() - entry["created"] < ttl()
+        if not fresh or not _exists(tag):
+            _remove(tag)
+            if not _create(package, tag, env):
+                _forget(snapshot)
+                return package.image
+
+            size = util.output(
+                ["docker", "image", "inspect", "--format={{.Size}}", tag]
+            )
+            _update(snapshot, image=tag, created=time.time(), size=int(size or 0))
+
+        _update(snapshot, image=tag, used=time.time())
+
+    evict(keep=[tag])
+    return tag
@@ -0,0 +1,86 @@
+import os
+import fcntl
+import hashlib
+import contextlib
+import util
+
+AUR = "https://github.com/archlinux/aur.git"
+
+
+@contextlib.contextmanager
+def lock(path):
+    with open(f"{path}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def mirror_path(url, branch):
+    key = hashlib.sha256(f"{url}#{branch or ''}".encode("utf-8")).hexdigest()
+    return os.path.realpath(os.path.join("cache", "git", f"{key}.git"))
+
+
+def ref(branch):
+    return "HEAD" if branch is None else f"refs/heads/{branch}"
+
+
+def ls_remote(url, refs, env=None):
+    output = util.output(["git", "ls-remote", url] + list(refs), env)
+    if output is None:
+        return None
+
+    heads = {}
+    for line in output.splitlines():
+        sha, name = line.split("\t", 1)
+        heads[name] = sha
+
+    return heads
+
+
+def checkout(url, branch, destination, shallow=True, env=None, chronic=False):
+    path = mirror_path(url, branch)
+    local = branch or "default"
+    fetch = ["git", "-C", path, "fetch", "--quiet", "--no-tags"]
+    if shallow:
+        fetch.append("--depth=1")
+
+    fetch += ["origin", f"+{ref(branch)}:refs/heads/{local}"]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with lock(path):
+        if not os.path.exists(path) and not (
+            util.run(["git", "init", "--quiet", "--bare", path], env, chronic=chronic)
+            and util.run(
+                ["git", "-C", path, "remote", "add", "origin", url],
+                env,
+                chronic=chronic,
+            )
+        ):
+            return False
+
+        if not util.run(fetch, env, chronic=chronic):
+            return False
+
+        if not util.run(
+            [
+                "git",
+                "clone",
+                "--quiet",
+                "--branch",
+                local,
+                "--single-branch",
+                path,
+                destination,
+            ],
+            env,
+            chronic=chronic,
+        ):
+            return False
+
+    return util.run(
+        ["git", "-C", destination, "remote", "set-url", "origin", url],
+        env,
+        chronic=chronic,
+    )
@@ -0,0 +1,49 @@
+import os
+import re
+
+FIELDS = ["depends", "makedepends", "checkdepends"]
+CONSTRAINT = re.compile(r"[<>=]")
+
+
+def parse(text):
+    # Only the pkgbase section matters for building, the pkgname sections
+    # describe the packages that come out of it
+    data = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or " = " not in line:
+            continue
+
+        key, value = line.split(" = ", 1)
+        if key == "pkgname":
+            break
+
+        data.setdefault(key, []).append(value)
+
+    return data
+
+
+def read(directory):
+    path = os.path.join(directory, ".SRCINFO")
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        return parse(f.read())
+
+
+def dependencies(data, arch=None):
+    if not data:
+        return []
+
+    arch = arch or os.uname().machine
+    names = []
+    for field in FIELDS:
+        for key in (field, f"{field}_{arch}"):
+            names += [x for x in data.get(key, []) if x not in names]
+
+    return names
+
+
+def name(depend):
+    return CONSTRAINT.split(depend, 1)[0]
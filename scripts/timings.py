@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import threading
+import contextlib
+
+MARKER = "::phase::"
+
+_events = []
+_threads = {}
+_lock = threading.Lock()
+
+
+def _tid():
+    ident = threading.get_ident()
+    with _lock:
+        if ident not in _threads:
+            _threads[ident] = len(_threads)
+            _events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": _threads[ident],
+                    "args": {"name": threading.current_thread().name},
+                }
+            )
+
+        return _threads[ident]
+
+
+def record(name, start, end, category="build", args=None):
+    event = {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": start // 1000,
+        "dur": max(end - start, 0) // 1000,
+        "pid": os.getpid(),
+        "tid": _tid(),
+        "args": args or {},
+    }
+    with _lock:
+        _events.append(event)
+
+
+@contextlib.contextmanager
+def span(name, category="build", **args):
+    start = time.time_ns()
+    try:
+        yield
+
+    finally:
+        record(name, start, time.time_ns(), category, args)
+
+
+def phases(markers, end, **args):
+    # Markers are "<epoch ns> <phase>" lines written by package.sh, each phase
+    # lasts until the next marker or until the container exits
+    points = []
+    for marker in markers:
+        timestamp, _, name = marker.strip().partition(" ")
+        if timestamp.isdigit() and name:
+            points.append((int(timestamp), name))
+
+    points.append((end, None))
+    for (start, name), (stop, _) in zip(points, points[1:]):
+        record(name, start, stop, "package.sh", args)
+
+
+def totals(since, **args):
+    with _lock:
+        events = [x for x in _events if x["ph"] == "X" and x["ts"] >= since // 1000]
+
+    totals = {}
+    for event in events:
+        if event["name"] == "build" or any(
+            [event["args"].get(x, None) != y for x, y in args.items()]
+        ):
+            continue
+
+        key = f"{event['cat']}/{event['name']}"
+        totals[key] = totals.get(key, 0) + event["dur"] / 1e6
+
+    return totals
+
+
+def export(path):
+    with _lock:
+        events = list(_events)
+
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    os.replace(f"{path}.tmp", path)
+
+
+def summary(limit=10):
+    with _lock:
+        events = [x for x in _events if x["ph"] == "X"]
+
+    phases = {}
+    for event in events:
+        key = (event["cat"], event["name"])
+        count, total, longest = phases.get(key, (0, 0, 0))
+        phases[key] = (count + 1, total + event["dur"], max(longest, event["dur"]))
+
+    print(f"{'Phase':<32} {'Count':>6} {'Total':>10} {'Max':>10}")
+    for (category, name), (count, total, longest) in sorted(
+        phases.items(), key=lambda x: x[1][1], reverse=True
+    ):
+        print(
+            f"{category + '/' + name:<32} {count:>6} "
+            f"{total / 1e6:>9.1f}s {longest / 1e6:>9.1f}s"
+        )
+
+    builds = sorted(
+        [x for x in events if x["name"] == "build" and "package" in x["args"]],
+        key=lambda x: x["dur"],
+        reverse=True,
+    )
+    if not builds:
+        return
+
+    print()
+    print(f"{'Package':<32} {'Duration':>10}")
+    for event in builds[:limit]:
+        print(f"{event['args']['package']:<32} {event['dur'] / 1e6:>9.1f}s")
@@ -0,0 +1,68 @@
+import os
+import json
+import sources
+import fingerprint
+
+from concurrent.futures import ThreadPoolExecutor
+
+REPORT = os.path.join("cache", "updates.json")
+BATCH_SIZE = 100
+
+
+def _env():
+    env = os.environ.copy()
+    env[
+        "GIT_SSH_COMMAND"
+    ] = "ssh -o UserKnownHostsFile=/dev/null -o StrictHostKeyChecking=no"
+    env["GIT_TERMINAL_PROMPT"] = "0"
+    return env
+
+
+def remote_commits(packages, jobs=16):
+    batches = {}
+    for package in packages:
+        batches.setdefault(package.git, set()).add(sources.ref(package.checkout_branch))
+
+    tasks = []
+    for url, refs in batches.items():
+        refs = sorted(refs)
+        for i in range(0, len(refs), BATCH_SIZE):
+            tasks.append((url, refs[i : i + BATCH_SIZE]))
+
+    heads = {}
+    env = _env()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(lambda x: sources.ls_remote(x[0], x[1], env), tasks)
+        for (url, _), result in zip(tasks, results):
+            if result is not None:
+                heads.setdefault(url, {}).update(result)
+
+    return {
+        x: heads.get(x.git, {}).get(sources.ref(x.checkout_branch), None)
+        for x in packages
+    }
+
+
+def check(packages, jobs=16):
+    stale = []
+    unknown = []
+    for package, commit in remote_commits(packages, jobs).items():
+        record = fingerprint.load(package.name)
+        if commit is None:
+            unknown.append(package)
+
+        elif record is None or record.get("commit", None) != commit:
+            stale.append(package)
+
+    return stale, unknown
+
+
+def save(report, path=REPORT):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def load(path=REPORT):
+    with open(path) as f:
+        return json.load(f)
@@ -1,11 +1,12 @@
 import contextlib
 import os
 import sys
-import subprocess
-import platform
+import threading
+import shutil
+import codecs
 
+from collections import deque
 from traceback import format_exc
-from blessed import Terminal
 
 
 @contextlib.contextmanager
@@ -19,30 +20,176 @@ def pushd(newDir):
         os.chdir(previousDir)
 
 
+LOGDIR = "logs"
+TAIL = int(os.environ.get("LOG_TAIL", 64)) * 1024
+CHUNK = 64 * 1024
+
+_output = threading.local()
+_output_lock = threading.RLock()
+
+
+class PrefixedOutput(object):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, data):
+        current = getattr(_output, "prefix", None)
+        if current is None:
+            with _output_lock:
+                return self.stream.write(data)
+
+        lines = (getattr(_output, "buffer", "") + data).split("\n")
+        _output.buffer = lines.pop()
+        with _output_lock:
+            for line in lines:
+                # Workflow commands like ::group:: only work at the start of
+                # a line
+                if line.startswith("::"):
+                    self.stream.write(f"{line}\n")
+
+                else:
+                    self.stream.write(f"{current}{line}\n")
+
+            self.stream.flush()
+
+        return len(data)
+
+    def flush(self):
+        with _output_lock:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+@contextlib.contextmanager
+def prefix(value):
+    with _output_lock:
+        if not isinstance(sys.stdout, PrefixedOutput):
+            sys.stdout = PrefixedOutput(sys.stdout)
+
+    previous = getattr(_output, "prefix", None)
+    _output.prefix = value
+    try:
+        yield
+
+    finally:
+        if getattr(_output, "buffer", ""):
+            print()
+
+        _output.prefix = previous
+
+
+class Tail(object):
+    def __init__(self, size):
+        self.size = size
+        self.chunks = deque()
+        self.length = 0
+        self.total = 0
+
+    def write(self, data):
+        self.chunks.append(data)
+        self.length += len(data)
+        self.total += len(data)
+        while len(self.chunks) > 1 and self.length - len(self.chunks[0]) >= self.size:
+            self.length -= len(self.chunks.popleft())
+
+    @property
+    def omitted(self):
+        return max(self.total - self.size, 0)
+
+    def getvalue(self):
+        return b"".join(self.chunks)[-self.size :]
+
+
+@contextlib.contextmanager
+def task(name):
+    os.makedirs(LOGDIR, exist_ok=True)
+    previous = getattr(_output, "log", None)
+    with open(os.path.join(LOGDIR, f"{name.replace('/', '-')}.log"), "wb") as f:
+        _output.log = f
+        try:
+            yield
+
+        finally:
+            _output.log = previous
+
+
+@contextlib.contextmanager
+def watch(marker):
+    previous = getattr(_output, "watch", None)
+    _output.watch = (marker.encode(), [])
+    try:
+        yield _output.watch[1]
+
+    finally:
+        _output.watch = previous
+
+
+def _watch(watch, pending, chunk):
+    marker, lines = watch
+    parts = (pending + chunk).split(b"\n")
+    for line in parts[:-1]:
+        line = line.lstrip(b"\r")
+        if line.startswith(marker):
+            lines.append(line[len(marker) :].decode(errors="replace"))
+
+    # Only the start of an unfinished line can matter, keep it bounded
+    return parts[-1][:CHUNK]
+
+
+def _stream(args, env, stdin, chronic):
+    import subprocess
+
+    tail = Tail(TAIL)
+    log = getattr(_output, "log", None)
+    watch = getattr(_output, "watch", None)
+    pending = b""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        env=env,
+        stdin=stdin,
+    ) as process:
+        for chunk in iter(lambda: process.stdout.read1(CHUNK), b""):
+            tail.write(chunk)
+            if watch is not None:
+                pending = _watch(watch, pending, chunk)
+
+            if log is not None:
+                log.write(chunk)
+
+            if not chronic:
+                sys.stdout.write(decoder.decode(chunk))
+                sys.stdout.flush()
+
+    if log is not None:
+        log.flush()
+
+    if not chronic:
+        sys.stdout.write(decoder.decode(b"", final=True))
+
+    return process.returncode, tail, log
+
+
 def run(args, env=None, stdin=None, chronic=False):
     try:
+        returncode, tail, log = _stream(args, env, stdin, chronic)
+        if not returncode:
+            return True
+
         if chronic:
-            subprocess.check_output(
-                args,
-                stderr=subprocess.STDOUT,
-                env=env,
-                stdin=stdin,
-            )
-        else:
-            subprocess.check_call(
-                args,
-                stdout=sys.stdout,
-                stderr=subprocess.STDOUT,
-                env=env,
-                stdin=stdin,
-            )
-        return True
-
-    except subprocess.CalledProcessError as ex:
-        if chronic:
-            print(ex.output.decode())
+            if tail.omitted:
+                print(f"  {tail.omitted} bytes of output omitted")
+
+            print(tail.getvalue().decode(errors="replace"))
 
-        print(f"  Process exited with code {ex.returncode}")
+        if log is not None:
+            print(f"  Full log: {log.name}")
+
+        print(f"  Process exited with code {returncode}")
         return False
 
     except Exception:
@@ -50,13 +197,50 @@ def run(args, env=None, stdin=None, chronic=False):
         return False
 
 
+def output(args, env=None):
+    import subprocess
+
+    try:
+        return (
+            subprocess.check_output(args, stderr=subprocess.DEVNULL, env=env)
+            .decode()
+            .strip()
+        )
+
+    except Exception:
+        return None
+
+
 def sudo_rm(path):
     if not run(["sudo", "-n", "rm", "-rf", path], chronic=True):
         raise Exception(f"Failed to remove {path}")
 
 
+def clean_dir(path):
+    if not os.path.exists(path):
+        os.makedirs(path)
+        return
+
+    # Empty the directory instead of replacing it, so that bind mounts of it in
+    # long lived containers keep pointing at the same directory
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, onerror=lambda f, p, e: sudo_rm(p))
+                continue
+
+            try:
+                os.unlink(entry.path)
+
+            except OSError:
+                sudo_rm(entry.path)
+
+
 def term():
     if not hasattr(term, "_handle"):
+        # blessed is slow to import, only load it once something is printed
+        from blessed import Terminal
+
         term._handle = Terminal()
 
     return term._handle
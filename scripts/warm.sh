@@ -0,0 +1,16 @@
+#!/bin/bash
+set -e
+source $(dirname "${BASH_SOURCE[0]}")/lib.sh
+sudo mkdir -p cache
+sudo find cache -path cache/git -prune -o -exec chown notroot:notroot {} +
+setup_chronic_and_keyring
+log "Updating..."
+_chronic yay -Sy --cachedir ./cache  --noconfirm || true
+command -v rsync &> /dev/null || yay -S --noconfirm --cachedir ./cache rsync
+log "Recording container state..."
+sudo mkdir -p /warm
+pacman -Q | LC_ALL=C sort | sudo tee /warm/packages > /dev/null
+sudo cp /etc/pacman.conf /warm/pacman.conf
+gpgconf --kill all &> /dev/null || true
+sudo tar -C "$HOME" -cpf /warm/home.tar .
+sudo tar -C /tmp -cpf /warm/tmp.tar .
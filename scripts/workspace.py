@@ -0,0 +1,105 @@
+import os
+import time
+import queue
+import shutil
+import itertools
+import threading
+import util
+
+MIN_FREE = float(os.environ.get("WORKSPACE_MIN_FREE", 5)) * 1024**3
+
+_queue = queue.Queue()
+_lock = threading.Lock()
+_counter = itertools.count()
+_thread = None
+
+
+def _trash():
+    return f"{os.path.realpath(os.environ.get('WORKDIR'))}.trash"
+
+
+def _delete(paths):
+    # One privileged rm for the whole batch instead of one per file that the
+    # container left behind
+    if util.run(["sudo", "-n", "rm", "-rf", "--"] + paths, chronic=True):
+        return
+
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _worker():
+    while True:
+        batch = [_queue.get()]
+        while True:
+            try:
+                batch.append(_queue.get_nowait())
+
+            except queue.Empty:
+                break
+
+        try:
+            _delete(batch)
+
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _discard(paths):
+    global _thread
+    with _lock:
+        if _thread is None:
+            trash = _trash()
+            if os.path.exists(trash):
+                with os.scandir(trash) as d:
+                    paths = [x.path for x in d] + paths
+
+            _thread = threading.Thread(target=_worker, daemon=True)
+            _thread.start()
+
+    for path in dict.fromkeys(paths):
+        _queue.put(path)
+
+
+def _guard(path):
+    if _queue.unfinished_tasks and shutil.disk_usage(path).free < MIN_FREE:
+        print(util.term().yellow("  Low on disk space, waiting for cleanup"))
+        drain()
+
+
+def recycle(path):
+    if not os.path.exists(path):
+        os.makedirs(path)
+        return
+
+    with os.scandir(path) as d:
+        entries = [x.path for x in d]
+
+    if not entries:
+        return
+
+    # The directory itself is kept so bind mounts of it stay valid, only its
+    # contents are moved out of the way to be deleted later
+    destination = os.path.join(_trash(), f"{time.time_ns()}-{next(_counter)}")
+    os.makedirs(destination)
+    remaining = []
+    for entry in entries:
+        try:
+            os.rename(entry, os.path.join(destination, os.path.basename(entry)))
+
+        except OSError:
+            remaining.append(entry)
+
+    if remaining and not util.run(
+        ["sudo", "-n", "mv", "-t", destination, "--"] + remaining, chronic=True
+    ):
+        util.clean_dir(path)
+
+    _discard([destination])
+    _guard(path)
+
+
+def drain():
+    if _thread is not None:
+        _queue.join()